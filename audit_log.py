@@ -0,0 +1,137 @@
+import os
+import sys
+import gzip
+import queue
+import shutil
+import threading
+from datetime import datetime
+
+
+class AuditLog:
+    # Audit entries go onto a queue and a background thread writes them to
+    # logs/inventory_YYYYMMDD.log through a file it keeps open. The thread
+    # drains everything queued before writing, so a burst of entries costs
+    # one write and one flush rather than an open and close each.
+    #
+    # The file rolls over at midnight (by the time the entry was made) and
+    # when it grows past max_bytes, continuing in inventory_YYYYMMDD.1.log,
+    # .2.log and so on. With compress=True the files of finished days are
+    # gzipped in the background.
+    def __init__(self, directory="logs", max_bytes=10 * 2**20, compress=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.compress = compress
+
+        self._queue = queue.Queue()
+        self._file = None
+        self._day = None
+        self._part = 0
+        self._closed = False
+
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def write(self, action):
+        self._queue.put((datetime.now(), action))
+
+    def flush(self):
+        # Blocks until everything written so far is on disk.
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def path(self, day, part=0):
+        suffix = f".{part}.log" if part else ".log"
+        return os.path.join(self.directory, f"inventory_{day}{suffix}")
+
+    def run(self):
+        if self.compress:
+            self.compress_finished_days(datetime.now().strftime("%Y%m%d"))
+
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            waiters = []
+            for item in batch:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    self.write_entry(*item)
+
+            if self._file is not None:
+                self._file.flush()
+            for done in waiters:
+                done.set()
+            if stop:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                return
+
+    def write_entry(self, timestamp, action):
+        entry = f"[{timestamp.strftime('%Y-%m-%d %H:%M:%S')}] {action}\n"
+        try:
+            self.open_for(timestamp.strftime("%Y%m%d"), len(entry.encode("utf-8")))
+            self._file.write(entry)
+        except OSError as e:
+            # Nobody is waiting on this thread to report to; keep going so
+            # later entries still have a chance once the problem clears.
+            print(f"Audit log write failed: {e}", file=sys.stderr)
+
+    def open_for(self, day, size):
+        if self._file is not None and day != self._day:
+            self._file.close()
+            self._file = None
+            finished, self._day = self._day, None
+            if self.compress:
+                self.compress_day(finished)
+
+        if self._file is None:
+            self._day = day
+            self._part = 0
+            while os.path.exists(self.path(day, self._part + 1)):
+                self._part += 1
+            self._file = open(self.path(day, self._part), "a", encoding="utf-8")
+
+        if self._file.tell() and self._file.tell() + size > self.max_bytes:
+            self._file.close()
+            self._part += 1
+            self._file = open(self.path(day, self._part), "a", encoding="utf-8")
+
+    def compress_day(self, day):
+        part = 0
+        while os.path.exists(self.path(day, part)):
+            self.compress_file(self.path(day, part))
+            part += 1
+
+    def compress_finished_days(self, today):
+        for name in os.listdir(self.directory):
+            if (
+                name.startswith("inventory_")
+                and name.endswith(".log")
+                and name[len("inventory_") :][:8] < today
+            ):
+                self.compress_file(os.path.join(self.directory, name))
+
+    def compress_file(self, path):
+        try:
+            with open(path, "rb") as src, gzip.open(path + ".gz", "ab") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+        except OSError as e:
+            print(f"Audit log compression failed: {e}", file=sys.stderr)
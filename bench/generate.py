@@ -0,0 +1,109 @@
+import os
+import random
+import string
+import argparse
+from datetime import date, timedelta
+from storage import write_json, write_records
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+BRANDS = [
+    "Samsung", "Apple", "Xiaomi", "Oppo", "Vivo", "Realme", "Infinix", "Asus",
+    "Lenovo", "Acer", "HP", "Logitech", "Sony", "JBL", "Anker", "Baseus",
+]
+MODELS = [
+    "Galaxy", "iPhone", "Redmi", "Reno", "Note", "Pad", "Book", "Buds", "Watch",
+    "Charger", "Cable", "Case", "Mouse", "Keyboard", "Speaker", "Powerbank",
+]
+VARIANTS = ["", "Pro", "Max", "Lite", "Plus", "Ultra", "Mini", "SE", "+"]
+
+
+def short_id(rng, taken, length=6):
+    characters = string.ascii_uppercase + string.digits
+    while True:
+        value = "".join(rng.choices(characters, k=length))
+        if value not in taken:
+            taken.add(value)
+            return value
+
+
+def generate(
+    directory,
+    sales,
+    products=None,
+    days=5 * 365,
+    end_date=date(2024, 12, 31),
+    seed=42,
+):
+    # Same schema main_FP3.py writes. A few best sellers take most of the
+    # sales and dates are spread over `days`, mostly in recording order with
+    # the odd back-dated entry, which is what a register produces.
+    rng = random.Random(seed)
+    products = products or max(50, int(sales**0.5) * 2)
+    os.makedirs(directory, exist_ok=True)
+
+    taken = set()
+    catalogue = {}
+    names = set()
+    for _ in range(products):
+        parts = (
+            rng.choice(BRANDS),
+            rng.choice(MODELS),
+            str(rng.randint(1, 99)),
+            rng.choice(VARIANTS),
+        )
+        name = " ".join(part for part in parts if part)
+        while name.casefold() in names:
+            name += f" {rng.randint(2, 9)}"
+        names.add(name.casefold())
+        catalogue[short_id(rng, taken)] = {
+            "name": name,
+            "price": rng.randint(10, 20_000) * 1000,
+            "stock": rng.randint(0, 500),
+        }
+
+    product_ids = list(catalogue)
+    weights = [1 / (rank + 1) for rank in range(len(product_ids))]
+    start_ordinal = (end_date - timedelta(days=days - 1)).toordinal()
+    ordinals = sorted(rng.randrange(days) for _ in range(sales))
+
+    transactions = []
+    taken_sales = set()
+    for offset, product_id in zip(
+        ordinals, rng.choices(product_ids, weights=weights, k=sales)
+    ):
+        if rng.random() < 0.01:
+            offset = max(0, offset - rng.randint(1, 30))
+        quantity = rng.choices((1, 2, 3, 4, 5), weights=(60, 20, 10, 6, 4))[0]
+        product = catalogue[product_id]
+        transactions.append(
+            {
+                "id": short_id(rng, taken_sales),
+                "date": date.fromordinal(start_ordinal + offset).strftime("%Y-%m-%d"),
+                "product_id": product_id,
+                "product": product["name"],
+                "quantity": quantity,
+                "total": product["price"] * quantity,
+            }
+        )
+
+    write_json(os.path.join(directory, "products.json"), catalogue)
+    write_records(os.path.join(directory, "sales.json"), transactions)
+    return directory
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic inventory data")
+    parser.add_argument("--size", choices=sorted(SIZES), default="10k")
+    parser.add_argument("--products", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    directory = args.output or os.path.join("bench", "data", args.size)
+    generate(directory, SIZES[args.size], products=args.products, seed=args.seed)
+    print(f"Wrote {SIZES[args.size]:,} sales to {directory}")
+
+
+if __name__ == "__main__":
+    main()
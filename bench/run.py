@@ -0,0 +1,212 @@
+import os
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from datetime import date, timedelta
+from bench.generate import SIZES, generate
+from inventory_store import InventoryStore
+
+SEARCH_KEYWORDS = ["s", "sa", "sam", "samsung", "pro max", "zzz"]
+
+
+class Report:
+    def __init__(self):
+        self.rows = []
+
+    def add(self, size, name, seconds, count=1, peak=None):
+        self.rows.append((size, name, seconds, count, peak))
+        peak_text = f"{peak / 2**20:9.1f} MiB" if peak is not None else ""
+        print(
+            f"{size:>5}  {name:<26} {seconds * 1000:11.2f} ms  "
+            f"{count / seconds if seconds else float('inf'):12,.0f} /s  {peak_text}",
+            flush=True,
+        )
+
+
+def measure(func, traced=False):
+    # One run: timed, or traced for its peak allocation. tracemalloc slows
+    # allocation down too much to share a run with the timing.
+    if traced:
+        tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - started
+    peak = None
+    if traced:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def dataset(size, data_root):
+    directory = os.path.join(data_root, size)
+    if not os.path.exists(os.path.join(directory, "sales.json")):
+        print(f"Generating {size} dataset in {directory} ...", flush=True)
+        generate(directory, SIZES[size])
+    return directory
+
+
+def open_store(source, workdir):
+    directory = os.path.join(workdir, "inventory")
+    shutil.rmtree(directory, ignore_errors=True)
+    shutil.copytree(source, directory)
+    return InventoryStore(directory, os.path.join(workdir, "logs"))
+
+
+def bench_store(size, source, workdir, traced=False):
+    # Runs every operation once, in order, on a fresh copy of the dataset.
+    # Returns the store and (operation, seconds, count, peak) per operation;
+    # with traced=True the peaks are filled in and the times are not worth
+    # reporting.
+    results = []
+
+    def run(name, func, count=1):
+        # `count` may be a function of the result, for counts known only
+        # once the operation has run.
+        result, seconds, peak = measure(func, traced)
+        if callable(count):
+            count = count(result)
+        results.append((name, seconds, count, peak))
+        return result
+
+    def load():
+        store = open_store(source, workdir)
+        store.load()
+        return store
+
+    store = run("load", load, lambda store: len(store.transactions))
+
+    run("save (full snapshot)", store.storage.compact, len(store.transactions))
+
+    def reload():
+        # Cold start again, now from the checkpoint the save just wrote.
+        again = InventoryStore(store.storage.directory, os.path.join(workdir, "logs"))
+        again.load()
+        again.close(save=False)
+        return again
+
+    run("load (from snapshot)", reload, lambda again: len(again.transactions))
+
+    rng = random.Random(7)
+    names = [data["name"] for data in store.products.values()]
+    for data in store.products.values():
+        data["stock"] = 10**9
+    today = date(2024, 12, 31)
+
+    def sales(count=1000):
+        for _ in range(count):
+            store.record_sale(
+                rng.choice(names), 1, today - timedelta(days=rng.randrange(30))
+            )
+
+    run("single sale", sales, 1000)
+
+    for keyword in SEARCH_KEYWORDS:
+        run(f"search products {keyword!r}", lambda: store.search_products(keyword))
+    for keyword in SEARCH_KEYWORDS:
+        run(f"search sales {keyword!r}", lambda: store.search_sales(keyword))
+
+    for label, days in [("week", 7), ("year", 365), ("all", 100 * 365)]:
+        start = today - timedelta(days=days - 1)
+        run(f"summary {label}", lambda: store.summary(start, today))
+    # The same range again, answered by the summary cache.
+    run("summary all (repeated)", lambda: store.summary(start, today))
+
+    store.close()
+    return store, results
+
+
+def bench_ui(size, store, report):
+    import tkinter as tk
+    from tkinter import ttk
+    from virtual_table import VirtualTable
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"Skipping Treeview benchmarks ({e}); run under xvfb-run", flush=True)
+        return
+    root.geometry("1000x600")
+    tree = ttk.Treeview(root, columns=("ID", "Date", "Product", "Quantity", "Total"))
+    scrollbar = ttk.Scrollbar(root, orient="vertical")
+    tree.pack(side="left", fill="both", expand=True)
+    scrollbar.pack(side="right", fill="y")
+    root.update()
+
+    def format_row(transaction):
+        return transaction["id"], (
+            transaction["id"],
+            transaction["date"].strftime("%Y-%m-%d"),
+            transaction["product"],
+            transaction["quantity"],
+            f"Rp{transaction['total']:,}",
+        )
+
+    table = VirtualTable(tree, scrollbar, format_row)
+
+    def refresh():
+        table.set_rows(store.transactions.newest_first())
+        root.update_idletasks()
+
+    _, seconds, _ = measure(refresh)
+    report.add(size, "refresh sales table", seconds, 1)
+
+    def scroll(steps=200):
+        for _ in range(steps):
+            table.scroll(3)
+            root.update_idletasks()
+
+    _, seconds, _ = measure(scroll)
+    report.add(size, "scroll 3 rows", seconds, 200)
+
+    _, seconds, _ = measure(lambda: table.yview("moveto", "0.5"))
+    report.add(size, "jump to middle", seconds, 1)
+    root.destroy()
+
+
+# Usage, from the repository root:
+#   python -m bench.run --sizes 10k,100k,1m
+#   xvfb-run python -m bench.run --sizes 100k --ui
+# Datasets are generated once into bench/data/<size> and copied to a scratch
+# directory for every run, so the committed numbers are always from the same
+# data.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inventory benchmarks")
+    parser.add_argument(
+        "--sizes", default="10k,100k", help="Comma separated: 10k,100k,1m"
+    )
+    parser.add_argument("--data", default=os.path.join("bench", "data"))
+    parser.add_argument("--no-memory", dest="memory", action="store_false")
+    parser.add_argument(
+        "--ui", action="store_true", help="Also time the Treeview (needs a display)"
+    )
+    args = parser.parse_args(argv)
+
+    report = Report()
+    print(
+        f"{'size':>5}  {'operation':<26} {'wall':>14}  "
+        f"{'throughput':>15}  {'peak':>13}"
+    )
+    for size in args.sizes.split(","):
+        source = dataset(size, args.data)
+        with tempfile.TemporaryDirectory() as workdir:
+            store, timings = bench_store(size, source, workdir)
+        peaks = [None] * len(timings)
+        if args.memory:
+            # A second pass on its own copy of the data, so no timed
+            # operation runs on data a traced one has changed.
+            with tempfile.TemporaryDirectory() as workdir:
+                _, traced = bench_store(size, source, workdir, traced=True)
+            peaks = [peak for _, _, _, peak in traced]
+        for (name, seconds, count, _), peak in zip(timings, peaks):
+            report.add(size, name, seconds, count, peak)
+        if args.ui:
+            bench_ui(size, store, report)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import json
+import threading
+import http.client
+from urllib.parse import urlencode, urlsplit, quote
+from storage import decode_sale
+from summary_cache import summarize
+
+# Talks to server.py with the same methods Main uses on an InventoryStore,
+# so the window can run against a shared store. Products are mirrored
+# locally (there are few of them); sales stay on the server and are read a
+# page at a time as the tables scroll.
+#
+# Any change, here or from another register, reaches listeners as a single
+# "bulk_changed"; changes from elsewhere are picked up by poll().
+PAGE_SIZE = 200
+
+
+class RemoteSalesView:
+    # Sequence over the sales matching `keyword`, newest first, fetched from
+    # the server in pages on first access.
+    def __init__(self, client, keyword=""):
+        self.client = client
+        self.keyword = keyword
+        self._pages = {}
+        self._count = self.fetch(0)
+
+    def fetch(self, page):
+        response = self.client.request(
+            "GET",
+            "/sales",
+            query={"q": self.keyword, "start": page * PAGE_SIZE, "limit": PAGE_SIZE},
+        )
+        self._pages[page] = [decode_sale(sale) for sale in response["sales"]]
+        return response["count"]
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        page, offset = divmod(index, PAGE_SIZE)
+        if page not in self._pages:
+            self.fetch(page)
+        # Shorter than expected if sales were removed since the first page.
+        return self._pages[page][offset]
+
+    def index(self, transaction):
+        for index in range(self._count):
+            if self[index]["id"] == transaction["id"]:
+                return index
+        raise ValueError(transaction["id"])
+
+
+class RemoteSales:
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, transaction_id):
+        try:
+            sale = self.client.request(
+                "GET", "/sales/" + quote(transaction_id, safe="")
+            )
+        except LookupError:
+            return None
+        return decode_sale(sale)
+
+    def newest_first(self):
+        return RemoteSalesView(self.client)
+
+
+class InventoryClient:
+    def __init__(self, url="http://127.0.0.1:8765", timeout=10):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.timeout = timeout
+
+        self.products = {}
+        self.transactions = RemoteSales(self)
+        self.listeners = []
+        self.version = None
+        # http.client connections are not thread-safe; searches run on a
+        # worker thread, so each thread keeps its own.
+        self._local = threading.local()
+
+    def connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(
+                self.host, self.port, timeout=self.timeout
+            )
+        return connection
+
+    def request(self, method, path, body=None, query=None):
+        if query:
+            path += "?" + urlencode(query)
+        # Bytes, so http.client sends the body in the same write as the
+        # headers.
+        payload = None if body is None else json.dumps(body).encode("utf-8")
+        headers = {"Content-Type": "application/json"} if payload else {}
+
+        # A kept-alive connection may have been dropped by a server restart;
+        # retry once on a fresh one, except for POST, which is not safe to
+        # send twice.
+        for attempt in range(2):
+            try:
+                connection = self.connection()
+                connection.request(method, path, payload, headers)
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                if attempt or method == "POST":
+                    raise ValueError(f"Inventory server unavailable: {e}") from None
+
+        result = json.loads(data) if data else None
+        if response.status == 404 and path.startswith(("/sales/", "/products/")):
+            raise LookupError(result["error"])
+        if response.status != 200:
+            raise ValueError(result["error"] if result else response.reason)
+        return result
+
+    def load(self):
+        state = self.request("GET", "/state")
+        self.products = state["products"]
+        self.version = state["version"]
+
+    def close(self, save=True):
+        # Saving is the server's job.
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def notify(self, event, item):
+        for listener in self.listeners:
+            listener(event, item)
+
+    def poll(self):
+        if self.request("GET", "/version")["version"] != self.version:
+            self.load()
+            self.notify("bulk_changed", None)
+
+    def apply(self, response):
+        if response["version"] == self.version + 1:
+            for product_id, data in response["products"].items():
+                if data is None:
+                    self.products.pop(product_id, None)
+                else:
+                    self.products[product_id] = data
+            self.version = response["version"]
+        else:
+            # Another register changed something in between.
+            self.load()
+        self.notify("bulk_changed", None)
+        return response
+
+    def change(self, method, path, body=None):
+        try:
+            return self.apply(self.request(method, path, body))
+        except LookupError as e:
+            raise ValueError(str(e)) from None
+
+    def add_product(self, name, price, stock):
+        body = {"name": name, "price": price, "stock": stock}
+        return self.change("POST", "/products", body)["id"]
+
+    def edit_product(self, product_id, name, price, stock):
+        body = {"name": name, "price": price, "stock": stock}
+        self.change("PUT", "/products/" + quote(product_id, safe=""), body)
+
+    def delete_product(self, product_id):
+        self.change("DELETE", "/products/" + quote(product_id, safe=""))
+
+    def record_sale(self, product_name, quantity, sale_date):
+        body = {
+            "product": product_name,
+            "quantity": quantity,
+            "date": sale_date.isoformat(),
+        }
+        return decode_sale(self.change("POST", "/sales", body)["sale"])
+
+    def record_basket(self, lines, sale_date):
+        body = {
+            "lines": [[product_name, quantity] for product_name, quantity in lines],
+            "date": sale_date.isoformat(),
+        }
+        response = self.change("POST", "/baskets", body)
+        return response["id"], [decode_sale(sale) for sale in response["sales"]]
+
+    def edit_sale(self, transaction_id, product_name, quantity, sale_date):
+        body = {
+            "product": product_name,
+            "quantity": quantity,
+            "date": sale_date.isoformat(),
+        }
+        path = "/sales/" + quote(transaction_id, safe="")
+        return decode_sale(self.change("PUT", path, body)["sale"])
+
+    def delete_sale(self, transaction_id):
+        path = "/sales/" + quote(transaction_id, safe="")
+        return decode_sale(self.change("DELETE", path)["sale"])
+
+    def import_rows(self, kind, rows, source):
+        # See csv_import.import_csv; the server applies the rows in one batch.
+        body = {"kind": kind, "source": source, "rows": rows}
+        response = self.change("POST", "/import", body)
+        return response["imported"], [tuple(error) for error in response["errors"]]
+
+    def summary(self, start_date, end_date, source=None):
+        if source is not None:
+            return summarize(source, start_date, end_date)
+        if start_date > end_date:
+            raise ValueError("Start date cannot be after end date.")
+        return self.request(
+            "GET",
+            "/summary",
+            query={"start": start_date.isoformat(), "end": end_date.isoformat()},
+        )
+
+    def search_products(self, keyword):
+        ids = self.request("GET", "/products", query={"q": keyword})["ids"]
+        # The mirror can lag the server until the next poll.
+        return [product_id for product_id in ids if product_id in self.products]
+
+    def search_sales(self, keyword, cancelled=lambda: False):
+        return RemoteSalesView(self, keyword.strip().lower())
@@ -0,0 +1,107 @@
+import csv
+import sys
+import argparse
+from datetime import date
+from money import parse_money
+from inventory_store import InventoryStore
+
+# End-of-day exports from the till. Product files have the columns
+# name, price, stock; sale files have date (YYYY-MM-DD), product (the
+# product name) and quantity. Other columns are ignored.
+COLUMNS = {
+    "products": ("name", "price", "stock"),
+    "sales": ("date", "product", "quantity"),
+}
+
+
+def parse_int(text, field):
+    try:
+        return int(text.strip())
+    except ValueError:
+        raise ValueError(f"{field.capitalize()} must be a whole number") from None
+
+
+def parse_row(kind, row):
+    if kind == "products":
+        try:
+            price = parse_money(row["price"])
+        except ValueError:
+            raise ValueError("Price must be a number") from None
+        return row["name"], price, parse_int(row["stock"], "stock")
+
+    try:
+        sale_date = date.fromisoformat(row["date"].strip())
+    except ValueError:
+        raise ValueError("Date must be written as YYYY-MM-DD") from None
+    return row["product"].strip(), parse_int(row["quantity"], "quantity"), sale_date
+
+
+def read_rows(f, kind, source):
+    # (line number, row) for each row of an open CSV file, after checking
+    # that it has the columns `kind` needs.
+    reader = csv.DictReader(f)
+    missing = [
+        column for column in COLUMNS[kind] if column not in (reader.fieldnames or [])
+    ]
+    if missing:
+        raise ValueError(f"{source} has no {', '.join(missing)} column")
+    return ((reader.line_num, row) for row in reader)
+
+
+def import_rows(store, kind, rows, source):
+    # Every row goes through the same checks as the dialogs; a row that
+    # fails them is skipped and reported as (line, message), and everything
+    # else is saved in one commit.
+    add = store.add_product if kind == "products" else store.record_sale
+    imported = 0
+    errors = []
+    with store.batch():
+        for line, row in rows:
+            try:
+                if None in row.values():
+                    raise ValueError("Row has fewer columns than the header")
+                add(*parse_row(kind, row))
+            except ValueError as e:
+                errors.append((line, " ".join(str(e).splitlines())))
+            else:
+                imported += 1
+        if imported:
+            store.log_action(f"Imported {imported} {kind} from {source}")
+    return imported, errors
+
+
+def import_csv(store, path, kind):
+    # Rows are read and applied one at a time, so the file is never held in
+    # memory. A client of the inventory server sends them to the server
+    # instead, which applies them the same way.
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        rows = read_rows(f, kind, path)
+        if hasattr(store, "import_rows"):
+            return store.import_rows(kind, list(rows), path)
+        return import_rows(store, kind, rows, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import products or sales from CSV")
+    parser.add_argument("kind", choices=sorted(COLUMNS))
+    parser.add_argument("path")
+    parser.add_argument("--directory", default="inventory")
+    parser.add_argument("--logs", default="logs")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    args = parser.parse_args(argv)
+
+    store = InventoryStore(args.directory, args.logs, backend=args.backend)
+    try:
+        store.load()
+        imported, errors = import_csv(store, args.path, args.kind)
+    finally:
+        store.close()
+
+    for line, message in errors:
+        print(f"{args.path}:{line}: {message}", file=sys.stderr)
+    print(f"Imported {imported} {args.kind}, skipped {len(errors)}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,405 @@
+import gc
+import os
+import contextlib
+import random
+import string
+from product_store import ProductStore
+from sales_store import SalesStore, line_id
+from search import SearchIndex
+from audit_log import AuditLog
+from money import check_int64
+from storage import open_storage
+from summary_cache import SummaryCache, summarize
+
+
+class InventoryStore:
+    # The inventory without any UI: validation, stock keeping, ids, the audit
+    # log and persistence. Every method raises ValueError with a message meant
+    # for the user when a request is rejected, and leaves the data untouched.
+    #
+    # Listeners are called as listener(event, item) so a front end can update
+    # its views incrementally:
+    #   "product_added", "product_changed", "product_removed"  -> product id
+    #   "sale_added"                                           -> transaction
+    #   "sale_removing" (before the sale leaves or moves)      -> transaction
+    #   "bulk_changed" (once, at the end of a batch)           -> None
+    def __init__(
+        self,
+        directory="inventory",
+        log_directory="logs",
+        backend="json",
+        journal=True,
+        compress_logs=False,
+        snapshots=True,
+    ):
+        self.log_directory = log_directory
+        for path in [log_directory, directory]:
+            if not os.path.exists(path):
+                os.makedirs(path)
+
+        self.storage = open_storage(
+            backend, directory, journal=journal, snapshots=snapshots
+        )
+        self.audit_log = AuditLog(log_directory, compress=compress_logs)
+        self.products = ProductStore()
+        self.transactions = SalesStore()
+        self.search_index = SearchIndex()
+        self.listeners = []
+        self._batch = None
+        # Bumped by every change, so cached summaries of older data are not
+        # served.
+        self.version = 0
+        self.summary_cache = SummaryCache()
+
+    def load(self):
+        # Loading creates a dict per sale and nothing that can form a cycle;
+        # letting the collector walk the growing heap meanwhile only slows
+        # startup down.
+        gc.disable()
+        try:
+            self.products, self.transactions = self.storage.load()
+            self.search_index = SearchIndex()
+            self.search_index.build(self.products, self.transactions)
+            self.version += 1
+        finally:
+            gc.enable()
+
+    def close(self, save=True):
+        # save=False leaves the files alone, for closing before or during a
+        # load that never finished.
+        if save:
+            self.storage.close()
+        self.audit_log.close()
+
+    @contextlib.contextmanager
+    def batch(self):
+        # Changes made inside are validated and applied one by one as usual,
+        # but reach storage as a single commit and listeners as a single
+        # "bulk_changed" when the block ends.
+        self._batch = {"products": {}, "sales": {}}
+        try:
+            yield
+        finally:
+            batch, self._batch = self._batch, None
+            if batch["products"] or batch["sales"]:
+                self.storage.commit(**batch)
+                self.version += 1
+                self.notify("bulk_changed", None)
+
+    def commit(self, products=None, sales=None):
+        self.version += 1
+        if self._batch is None:
+            self.storage.commit(products=products, sales=sales)
+        else:
+            self._batch["products"].update(products or {})
+            self._batch["sales"].update(sales or {})
+
+    def notify(self, event, item):
+        if self._batch is not None and event != "bulk_changed":
+            return
+        for listener in self.listeners:
+            listener(event, item)
+
+    def generate_short_id(self, length=6):
+        characters = string.ascii_uppercase + string.digits
+        return "".join(random.choices(characters, k=length))
+
+    def log_action(self, action: str):
+        self.audit_log.write(action)
+
+    def validate_product(self, name, price, stock, product_id=None):
+        if not name:
+            raise ValueError("Product name is required!")
+        if price <= 0:
+            raise ValueError("Price must be positive")
+        if stock < 0:
+            raise ValueError("Stock cannot be negative")
+        check_int64(price, "Price")
+        check_int64(stock, "Stock")
+        if self.products.find_id(name) not in (None, product_id):
+            raise ValueError("Product with this name already exists!")
+
+    def add_product(self, name, price, stock):
+        name = name.strip()
+        self.validate_product(name, price, stock)
+
+        product_id = self.generate_short_id()
+        while product_id in self.products:
+            product_id = self.generate_short_id()
+
+        self.products[product_id] = {"name": name, "price": price, "stock": stock}
+        self.search_index.add_product(product_id, name)
+
+        self.log_action(
+            f"New product added: {name} "
+            f"(ID: {product_id}, Price: Rp {price:,}, Stock: {stock})"
+        )
+        self.commit(products={product_id: self.products[product_id]})
+        self.notify("product_added", product_id)
+        return product_id
+
+    def edit_product(self, product_id, name, price, stock):
+        name = name.strip()
+        self.validate_product(name, price, stock, product_id)
+
+        old_values = self.products[product_id].copy()
+        self.products.rename(product_id, name)
+        self.products[product_id].update({"price": price, "stock": stock})
+        self.search_index.rename_product(product_id, name)
+
+        self.log_action(
+            f"Edited product ID: {product_id}\n"
+            f"  Name: {old_values['name']} → {name}\n"
+            f"  Price: Rp {old_values['price']:,} → Rp {price:,}\n"
+            f"  Stock: {old_values['stock']} → {stock}"
+        )
+        self.commit(products={product_id: self.products[product_id]})
+        self.notify("product_changed", product_id)
+
+    def delete_product(self, product_id):
+        product_data = self.products[product_id]
+        self.log_action(
+            f"Deleted product: {product_data['name']} "
+            f"(ID: {product_id}, "
+            f"Price: Rp {product_data['price']:,}, "
+            f"Stock: {product_data['stock']})"
+        )
+        del self.products[product_id]
+        self.search_index.remove_product(product_id)
+        self.commit(products={product_id: None})
+        self.notify("product_removed", product_id)
+
+    def resolve_product(self, product_name, quantity):
+        product_id = self.products.find_id(product_name)
+        if not product_id:
+            raise ValueError("Please select a product")
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive")
+        check_int64(quantity, "Quantity")
+        check_int64(self.products[product_id]["price"] * quantity, "Total")
+        return product_id
+
+    def record_sale(self, product_name, quantity, sale_date):
+        product_id = self.resolve_product(product_name, quantity)
+
+        current_stock = self.products[product_id]["stock"]
+        if quantity > current_stock:
+            raise ValueError(
+                f"Insufficient stock!\nRequested: {quantity}\n"
+                f"Available: {current_stock}"
+            )
+
+        total = self.products[product_id]["price"] * quantity
+        old_stock = current_stock
+        self.products[product_id]["stock"] -= quantity
+
+        transaction_id = self.generate_short_id()
+        while transaction_id in self.transactions:
+            transaction_id = self.generate_short_id()
+
+        transaction = self.transactions.add(
+            {
+                "id": transaction_id,
+                "date": sale_date,
+                "product_id": product_id,
+                "product": self.products[product_id]["name"],
+                "quantity": quantity,
+                "total": total,
+            }
+        )
+        self.search_index.add_sale(transaction)
+
+        self.log_action(
+            f"Sale recorded: ID: {transaction_id}\n"
+            f"  Product: {transaction['product']} (ID: {product_id})\n"
+            f"  Date: {sale_date.strftime('%Y-%m-%d')}\n"
+            f"  Quantity: {quantity}\n"
+            f"  Total: Rp {total:,}\n"
+            f"  Stock: {old_stock} → {self.products[product_id]['stock']}"
+        )
+        self.commit(
+            products={product_id: self.products[product_id]},
+            sales={transaction_id: transaction},
+        )
+        self.notify("product_changed", product_id)
+        self.notify("sale_added", transaction)
+        return transaction
+
+    def record_basket(self, lines, sale_date):
+        # A checkout of several products as one transaction: `lines` is a
+        # list of (product name, quantity). Every line is checked against
+        # the stock before anything changes; repeated products are merged.
+        # Each line item is stored as a sale with id "<basket>-<n>", so
+        # search, the summary and editing or voiding a single line work as
+        # for any sale.
+        if not lines:
+            raise ValueError("The basket is empty")
+        items = {}
+        for product_name, quantity in lines:
+            product_id = self.resolve_product(product_name, quantity)
+            items[product_id] = items.get(product_id, 0) + quantity
+        for product_id, quantity in items.items():
+            product = self.products[product_id]
+            if quantity > product["stock"]:
+                raise ValueError(
+                    f"Insufficient stock for {product['name']}!\n"
+                    f"Requested: {quantity}\nAvailable: {product['stock']}"
+                )
+            check_int64(product["price"] * quantity, "Total")
+
+        basket_id = self.generate_short_id()
+        while basket_id in self.transactions or any(
+            line_id(basket_id, line) in self.transactions
+            for line in range(1, len(items) + 1)
+        ):
+            basket_id = self.generate_short_id()
+
+        transactions = []
+        details = []
+        for line, (product_id, quantity) in enumerate(items.items(), 1):
+            product = self.products[product_id]
+            product["stock"] -= quantity
+            transaction = self.transactions.add(
+                {
+                    "id": line_id(basket_id, line),
+                    "date": sale_date,
+                    "product_id": product_id,
+                    "product": product["name"],
+                    "quantity": quantity,
+                    "total": product["price"] * quantity,
+                }
+            )
+            self.search_index.add_sale(transaction)
+            transactions.append(transaction)
+            details.append(
+                f"  {line}. {product['name']} (ID: {product_id}) x{quantity}: "
+                f"Rp {transaction['total']:,}, Stock: "
+                f"{product['stock'] + quantity} → {product['stock']}"
+            )
+
+        total = sum(transaction["total"] for transaction in transactions)
+        self.log_action(
+            f"Basket sale recorded: ID: {basket_id}\n"
+            f"  Date: {sale_date.strftime('%Y-%m-%d')}\n"
+            + "\n".join(details)
+            + f"\n  Total: Rp {total:,}"
+        )
+        self.commit(
+            products={product_id: self.products[product_id] for product_id in items},
+            sales={transaction["id"]: transaction for transaction in transactions},
+        )
+        for product_id in items:
+            self.notify("product_changed", product_id)
+        for transaction in transactions:
+            self.notify("sale_added", transaction)
+        return basket_id, transactions
+
+    def edit_sale(self, transaction_id, product_name, quantity, sale_date):
+        transaction = self.transactions.get(transaction_id)
+        if transaction is None:
+            raise ValueError(f"Unknown transaction ID: {transaction_id}")
+        new_product_id = self.resolve_product(product_name, quantity)
+
+        old_product_id = transaction["product_id"]
+        available = self.products[new_product_id]["stock"]
+        if new_product_id == old_product_id:
+            available += transaction["quantity"]
+        if quantity > available:
+            raise ValueError(
+                f"Insufficient stock!\nRequested: {quantity}\nAvailable: {available}"
+            )
+
+        # The sale's product may have been deleted since; its stock went
+        # with it.
+        if old_product_id in self.products:
+            self.products[old_product_id]["stock"] += transaction["quantity"]
+        self.products[new_product_id]["stock"] -= quantity
+        new_total = self.products[new_product_id]["price"] * quantity
+
+        old_values = {
+            "date": transaction["date"].strftime("%Y-%m-%d"),
+            "product": transaction["product"],
+            "quantity": transaction["quantity"],
+            "total": transaction["total"],
+        }
+
+        self.notify("sale_removing", transaction)
+        self.search_index.remove_sale(transaction)
+        self.transactions.update(
+            transaction_id,
+            {
+                "date": sale_date,
+                "product_id": new_product_id,
+                "product": self.products[new_product_id]["name"],
+                "quantity": quantity,
+                "total": new_total,
+            },
+        )
+        self.search_index.add_sale(transaction)
+
+        self.log_action(
+            f"Edited sale ID: {transaction_id}\n"
+            f"  Date: {old_values['date']} → {sale_date.strftime('%Y-%m-%d')}\n"
+            f"  Product: {old_values['product']} → {transaction['product']}\n"
+            f"  Quantity: {old_values['quantity']} → {quantity}\n"
+            f"  Total: Rp {old_values['total']:,} → Rp {new_total:,}"
+        )
+        changed = [
+            pid for pid in {old_product_id, new_product_id} if pid in self.products
+        ]
+        self.commit(
+            products={pid: self.products[pid] for pid in changed},
+            sales={transaction_id: transaction},
+        )
+        for pid in changed:
+            self.notify("product_changed", pid)
+        self.notify("sale_added", transaction)
+        return transaction
+
+    def delete_sale(self, transaction_id):
+        transaction = self.transactions.get(transaction_id)
+        if transaction is None:
+            raise ValueError(f"Unknown transaction ID: {transaction_id}")
+
+        # Restore product stock, unless the product was deleted since
+        product_id = transaction["product_id"]
+        restock = product_id in self.products
+        if restock:
+            self.products[product_id]["stock"] += transaction["quantity"]
+
+        self.notify("sale_removing", transaction)
+        self.search_index.remove_sale(transaction)
+        transaction = self.transactions.remove(transaction_id)
+
+        self.log_action(
+            f"Deleted sale: ID: {transaction_id}\n"
+            f"  Product: {transaction['product']}\n"
+            f"  Date: {transaction['date'].strftime('%Y-%m-%d')}\n"
+            f"  Quantity: {transaction['quantity']}\n"
+            f"  Total: Rp {transaction['total']:,}"
+        )
+        self.commit(
+            products={product_id: self.products[product_id]} if restock else None,
+            sales={transaction_id: None},
+        )
+        if restock:
+            self.notify("product_changed", product_id)
+        return transaction
+
+    def summary(self, start_date, end_date, source=None):
+        # source can be anything else with a storage-style summary(), such
+        # as a mapped sales file, to report without the loaded history.
+        if source is not None:
+            return summarize(source, start_date, end_date)
+        return self.summary_cache.summary(
+            self.storage, start_date, end_date, self.version
+        )
+
+    def search_products(self, keyword):
+        return self.search_index.find_products(keyword.strip().lower())
+
+    def search_sales(self, keyword, cancelled=lambda: False):
+        keyword = keyword.strip().lower()
+        if not keyword:
+            return self.transactions.newest_first()
+        return self.search_index.find_sales(keyword, cancelled, self.transactions)
@@ -1,54 +1,155 @@
 import os
-import json
+import queue
+import bisect
+import argparse
+import threading
 import tkinter as tk
-from tkinter import ttk, messagebox
 from datetime import datetime
-from decimal import Decimal
+from tkinter import ttk, messagebox, filedialog
 from tkcalendar import DateEntry
-import random
-import string
+from money import parse_money
+from inventory_store import InventoryStore
+from summary_engine import SummaryEngine
+from csv_import import import_csv
+from client import InventoryClient
+from virtual_table import VirtualTable
+from search import SearchWorker
+
+SERVER_POLL_INTERVAL = 2000
 
 
 class Main:
-    def __init__(self):
+    def __init__(
+        self,
+        backend="json",
+        journal=True,
+        compress_logs=False,
+        snapshots=True,
+        sales_file=None,
+        server=None,
+    ):
         self.root = tk.Tk()
         self.root.title("Inventory System")
         self.root.geometry("1000x600")
 
-        self.products = {}
-        self.transactions = []
+        if server:
+            # A thin client: the server owns the data and saves it.
+            self.store = InventoryClient(server)
+        else:
+            self.store = InventoryStore(
+                "inventory",
+                "logs",
+                backend=backend,
+                journal=journal,
+                compress_logs=compress_logs,
+                snapshots=snapshots,
+            )
+        self.server = server
+        self.store.listeners.append(self.on_store_change)
+        self.search = SearchWorker(self.root, on_error=self.show_search_error)
+        # A mapped sales file answers the Summary tab without waiting for
+        # the history to load, spreading long ranges over a process pool.
+        # It holds nothing newer than when it was written, so it is closed
+        # once the store has loaded.
+        self.sales_file = SummaryEngine(sales_file) if sales_file else None
+
+        # The window comes up empty and the data is read on a worker thread,
+        # so how long the first frame takes does not depend on the history.
+        self.setup_ui()
+        self.loading = True
+        self.set_loading(True)
+        self._loaded = queue.Queue()
+        threading.Thread(target=self.load_in_background, daemon=True).start()
+        self.root.after(50, self.poll_load)
+
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    @property
+    def products(self):
+        return self.store.products
+
+    @property
+    def transactions(self):
+        return self.store.transactions
+
+    def on_store_change(self, event, item):
+        if event == "sale_added":
+            self.insert_sale_row(item)
+        elif event == "sale_removing":
+            self.remove_sale_row(item)
+        elif event == "product_added":
+            if self.product_matches_search(item):
+                self.products_table.rows.append(item)
+                self.products_table.row_added(len(self.products_table.rows) - 1)
+        elif event == "product_removed":
+            self.refresh_product_list()
+        elif event == "bulk_changed":
+            self.refresh_product_list()
+            self.refresh_sales_list()
+
+    def after_change(self):
+        self.products_table.render()
+        self.sales_table.render()
+        self.rerun_running_searches()
+
+    def load_in_background(self):
+        try:
+            self.store.load()
+        except Exception as e:
+            self._loaded.put(e)
+        else:
+            self._loaded.put(None)
 
-        for directory in ["logs", "inventory"]:
-            if not os.path.exists(directory):
-                os.makedirs(directory)
+    def poll_load(self):
+        try:
+            error = self._loaded.get_nowait()
+        except queue.Empty:
+            self.root.after(50, self.poll_load)
+            return
 
-        self.load_data()
-        self.setup_ui()
+        if error is not None:
+            messagebox.showerror("Error", f"Could not load inventory data:\n{error}")
+            self.root.destroy()
+            return
+
+        self.loading = False
+        if self.sales_file is not None:
+            self.sales_file.close()
+            self.sales_file = None
         self.refresh_product_list()
         self.refresh_sales_list()
+        self.set_loading(False)
+        if self.server:
+            self.root.after(SERVER_POLL_INTERVAL, self.poll_server)
 
-    def load_data(self):
-        if os.path.exists("inventory/products.json"):
-            with open("inventory/products.json", "r") as f:
-                self.products = json.load(f)
-                for product_data in self.products.values():
-                    product_data["price"] = Decimal(str(product_data["price"]))
-
-        if os.path.exists("inventory/sales.json"):
-            with open("inventory/sales.json", "r") as f:
-                self.transactions = json.load(f)
-                for transaction in self.transactions:
-                    transaction["date"] = datetime.strptime(
-                        transaction["date"], "%Y-%m-%d"
-                    ).date()
-                    transaction["total"] = Decimal(str(transaction["total"]))
-
-    def save_data(self):
-        with open("inventory/products.json", "w") as f:
-            json.dump(self.products, f, default=str)
-
-        with open("inventory/sales.json", "w") as f:
-            json.dump(self.transactions, f, default=str)
+    def poll_server(self):
+        # Pick up what other registers changed.
+        try:
+            self.store.poll()
+        except ValueError:
+            pass
+        self.root.after(SERVER_POLL_INTERVAL, self.poll_server)
+
+    def set_loading(self, loading):
+        # Everything that reads or changes the store waits for the load.
+        state = "disabled" if loading else "normal"
+        for widget in self.store_widgets:
+            widget.configure(state=state)
+        for index in range(self.file_menu.index("end") + 1):
+            self.file_menu.entryconfigure(index, state=state)
+
+        if loading:
+            self.loading_bar.start(10)
+        else:
+            self.loading_bar.stop()
+            self.status_frame.pack_forget()
+
+    def on_close(self):
+        # Closing mid-load must not compact a half-read store over the files.
+        self.store.close(save=not self.loading)
+        if self.sales_file is not None:
+            self.sales_file.close()
+        self.root.destroy()
 
     def setup_ui(self):
         style = ttk.Style()
@@ -59,6 +160,29 @@ class Main:
         style.configure("Custom.Treeview", font=("Arial", 10))
         style.configure("Test.Treeview", font=("Arial", 10), anchor="center")
 
+        menubar = tk.Menu(self.root)
+        self.file_menu = tk.Menu(menubar, tearoff=0)
+        self.file_menu.add_command(
+            label="Import Products from CSV...",
+            command=lambda: self.import_csv_file("products"),
+        )
+        self.file_menu.add_command(
+            label="Import Sales from CSV...",
+            command=lambda: self.import_csv_file("sales"),
+        )
+        menubar.add_cascade(label="File", menu=self.file_menu)
+        self.root.configure(menu=menubar)
+
+        self.status_frame = ttk.Frame(self.root)
+        self.status_frame.pack(side="bottom", fill="x", padx=10, pady=(0, 5))
+        ttk.Label(self.status_frame, text="Loading inventory data...").pack(
+            side="left", padx=5
+        )
+        self.loading_bar = ttk.Progressbar(
+            self.status_frame, mode="indeterminate", length=200
+        )
+        self.loading_bar.pack(side="left", padx=5)
+
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(expand=True, fill="both", padx=10, pady=5)
 
@@ -70,14 +194,17 @@ class Main:
         control_frame = ttk.Frame(products_frame)
         control_frame.pack(fill="x", padx=5, pady=5)
 
-        ttk.Button(
+        add_product_button = ttk.Button(
             control_frame, text="Add Product", command=self.show_add_product_dialog
-        ).pack(side="left", padx=5)
+        )
+        add_product_button.pack(side="left", padx=5)
 
         ttk.Label(control_frame, text="Search:").pack(side="left", padx=5)
         self.product_search_entry = ttk.Entry(control_frame)
         self.product_search_entry.pack(side="left", padx=5)
-        self.product_search_entry.bind("<KeyRelease>", self.refresh_product_list)
+        self.product_search_entry.bind(
+            "<KeyRelease>", self.schedule_product_search
+        )
 
         self.delete_product_button = ttk.Button(
             control_frame,
@@ -117,10 +244,10 @@ class Main:
 
         self.products_tree.bind("<<TreeviewSelect>>", self.on_product_select)
 
-        product_scrollbar = ttk.Scrollbar(
-            product_tree_frame, orient="vertical", command=self.products_tree.yview
+        product_scrollbar = ttk.Scrollbar(product_tree_frame, orient="vertical")
+        self.products_table = VirtualTable(
+            self.products_tree, product_scrollbar, self.format_product_row
         )
-        self.products_tree.configure(yscrollcommand=product_scrollbar.set)
         self.products_tree.pack(side="left", fill="both", expand=True)
         self.products_tree.tag_configure("center", anchor="center")
 
@@ -138,14 +265,20 @@ class Main:
         sales_control_frame = ttk.Frame(sales_frame)
         sales_control_frame.pack(fill="x", padx=5, pady=5)
 
-        ttk.Button(
+        add_sale_button = ttk.Button(
             sales_control_frame, text="Add Sale", command=self.show_add_sale_dialog
-        ).pack(side="left", padx=5)
+        )
+        add_sale_button.pack(side="left", padx=5)
+
+        add_basket_button = ttk.Button(
+            sales_control_frame, text="New Basket", command=self.show_basket_dialog
+        )
+        add_basket_button.pack(side="left", padx=5)
 
         ttk.Label(sales_control_frame, text="Search:").pack(side="left", padx=5)
         self.sales_search_entry = ttk.Entry(sales_control_frame)
         self.sales_search_entry.pack(side="left", padx=5)
-        self.sales_search_entry.bind("<KeyRelease>", self.refresh_sales_list)
+        self.sales_search_entry.bind("<KeyRelease>", self.schedule_sales_search)
 
         self.delete_sale_button = ttk.Button(
             sales_control_frame,
@@ -184,10 +317,10 @@ class Main:
         self.sales_tree.column("Quantity", width=100)
         self.sales_tree.column("Total", width=150)
 
-        sales_scrollbar = ttk.Scrollbar(
-            sales_tree_frame, orient="vertical", command=self.sales_tree.yview
+        sales_scrollbar = ttk.Scrollbar(sales_tree_frame, orient="vertical")
+        self.sales_table = VirtualTable(
+            self.sales_tree, sales_scrollbar, self.format_sale_row
         )
-        self.sales_tree.configure(yscrollcommand=sales_scrollbar.set)
         self.sales_tree.pack(side="left", fill="both", expand=True)
         self.sales_tree.tag_configure("center", anchor="center")
 
@@ -226,46 +359,45 @@ class Main:
         )
         self.end_date.pack(side="left", padx=5)
 
-        ttk.Button(
+        summary_button = ttk.Button(
             date_frame, text="Generate Summary", command=self.generate_summary
-        ).pack(side="left", padx=5)
+        )
+        summary_button.pack(side="left", padx=5)
 
         self.summary_text = tk.Text(summary_frame, height=20, width=60)
         self.summary_text.pack(padx=5, pady=5, fill="both", expand=True)
 
-    def generate_short_id(self, length=6):
-        characters = string.ascii_uppercase + string.digits
-        return "".join(random.choices(characters, k=length))
+        self.store_widgets = [
+            add_product_button,
+            self.product_search_entry,
+            add_sale_button,
+            add_basket_button,
+            self.sales_search_entry,
+        ]
+        if self.sales_file is None:
+            self.store_widgets.append(summary_button)
 
     def generate_summary(self):
         try:
             start_date = self.start_date.get_date()
             end_date = self.end_date.get_date()
 
-            if start_date > end_date:
-                raise ValueError("Start date cannot be after end date.")
-
-            filtered_transactions = [
-                transaction
-                for transaction in self.transactions
-                if start_date <= transaction["date"] <= end_date
-            ]
-
-            total_amount = sum(t["total"] for t in filtered_transactions)
-
-            product_summary = {}
-            for transaction in filtered_transactions:
-                product = transaction["product"]
-                if product not in product_summary:
-                    product_summary[product] = {"quantity": 0, "total": Decimal("0")}
-                product_summary[product]["quantity"] += transaction["quantity"]
-                product_summary[product]["total"] += transaction["total"]
+            report = self.store.summary(start_date, end_date, self.sales_file)
+            product_summary = report["products"]
+            transaction_count = report["transactions"]
+            total_amount = report["total"]
 
             self.summary_text.delete(1.0, tk.END)
 
             summary = f"Summary Report ({start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')})\n"
             summary += "=" * 50 + "\n\n"
-            summary += f"Total Transactions: {len(filtered_transactions)}\n"
+            if self.sales_file is not None:
+                written = datetime.fromtimestamp(os.path.getmtime(self.sales_file.path))
+                summary += (
+                    f"From the sales file of {written.strftime('%Y-%m-%d %H:%M')}; "
+                    "later sales are not included until loading finishes.\n\n"
+                )
+            summary += f"Total Transactions: {transaction_count}\n"
             summary += f"Total Amount: Rp{total_amount:,}\n\n"
             summary += "Sales Detail:\n"
             summary += "-" * 50 + "\n"
@@ -280,13 +412,30 @@ class Main:
         except ValueError as e:
             messagebox.showerror("Error", str(e))
 
-    def log_action(self, action: str):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_file = f"logs/inventory_{datetime.now().strftime('%Y%m%d')}.log"
-        log_entry = f"[{timestamp}] {action}\n"
+    def import_csv_file(self, kind):
+        path = filedialog.askopenfilename(
+            title=f"Import {kind.capitalize()} from CSV",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")],
+        )
+        if not path:
+            return
+
+        try:
+            imported, errors = import_csv(self.store, path, kind)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", str(e))
+            return
 
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(log_entry)
+        message = f"Imported {imported} {kind}."
+        if not errors:
+            messagebox.showinfo("Import Complete", message)
+            return
+        shown = errors[:20]
+        message += f"\n\nSkipped {len(errors)} rows:\n"
+        message += "\n".join(f"Line {line}: {text}" for line, text in shown)
+        if len(errors) > len(shown):
+            message += f"\n... and {len(errors) - len(shown)} more"
+        messagebox.showwarning("Import Complete", message)
 
     def show_add_product_dialog(self):
         dialog = tk.Toplevel(self.root)
@@ -309,37 +458,12 @@ class Main:
 
         def save_product():
             try:
-                name = name_entry.get().strip()
-                price = Decimal(price_entry.get())
-                stock = int(stock_entry.get())
-
-                if not name:
-                    raise ValueError("Product name is required!")
-                if price <= 0:
-                    raise ValueError("Price must be positive")
-                if stock < 0:
-                    raise ValueError("Stock cannot be negative")
-
-                for _, data in self.products.items():
-                    if data["name"].lower() == name.lower():
-                        raise ValueError("Product with this name already exists!")
-
-                product_id = self.generate_short_id()
-                while product_id in self.products:
-                    product_id = self.generate_short_id()
-
-                self.products[product_id] = {
-                    "name": name,
-                    "price": price,
-                    "stock": stock,
-                }
-
-                self.log_action(
-                    f"New product added: {name} (ID: {product_id}, Price: Rp {price:,}, Stock: {stock})"
+                self.store.add_product(
+                    name_entry.get(),
+                    parse_money(price_entry.get()),
+                    int(stock_entry.get()),
                 )
-
-                self.refresh_product_list()
-                self.save_data()
+                self.after_change()
                 dialog.destroy()
                 messagebox.showinfo("Success", "Product saved successfully.")
 
@@ -376,73 +500,104 @@ class Main:
 
         def save_sale():
             try:
-                product_name = product_var.get()
-                quantity = int(quantity_entry.get())
-                sale_date = date_picker.get_date()
-
-                product_id = None
-                for pid, data in self.products.items():
-                    if data["name"] == product_name:
-                        product_id = pid
-                        break
-
-                if not product_id:
-                    raise ValueError("Please select a product")
-                if quantity <= 0:
-                    raise ValueError("Quantity must be positive")
-
-                current_stock = self.products[product_id]["stock"]
-                if quantity > current_stock:
-                    raise ValueError(
-                        f"Insufficient stock!\nRequested: {quantity}\nAvailable: {current_stock}"
-                    )
-
-                total = self.products[product_id]["price"] * quantity
-                old_stock = current_stock
-                self.products[product_id]["stock"] -= quantity
-
-                transaction_id = self.generate_short_id()
-                while any(t["id"] == transaction_id for t in self.transactions):
-                    transaction_id = self.generate_short_id()
-
-                self.transactions.append(
-                    {
-                        "id": transaction_id,
-                        "date": sale_date,
-                        "product_id": product_id,
-                        "product": product_name,
-                        "quantity": quantity,
-                        "total": total,
-                    }
+                transaction = self.store.record_sale(
+                    product_var.get(), int(quantity_entry.get()), date_picker.get_date()
                 )
+                self.after_change()
+                dialog.destroy()
 
-                self.log_action(
-                    f"Sale recorded: ID: {transaction_id}\n"
-                    f"  Product: {product_name} (ID: {product_id})\n"
-                    f"  Date: {sale_date.strftime('%Y-%m-%d')}\n"
-                    f"  Quantity: {quantity}\n"
-                    f"  Total: Rp {total:,}\n"
-                    f"  Stock: {old_stock} → {self.products[product_id]['stock']}"
+                messagebox.showinfo(
+                    "Success",
+                    f"Sale recorded successfully!\n\n"
+                    f"Transaction ID: {transaction['id']}\n"
+                    f"Product: {transaction['product']}\n"
+                    f"Quantity: {transaction['quantity']}\n"
+                    f"Total: Rp{transaction['total']:,}",
                 )
 
-                self.refresh_product_list()
-                self.refresh_sales_list()
-                self.save_data()
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+
+        ttk.Button(dialog, text="Save", command=save_sale).pack(pady=20)
+
+    def show_basket_dialog(self):
+        dialog = tk.Toplevel(self.root)
+        dialog.title("New Basket")
+        dialog.geometry("360x520")
+        dialog.transient(self.root)
+        dialog.grab_set()
+
+        ttk.Label(dialog, text="Date:").pack(pady=5)
+        date_picker = DateEntry(
+            dialog, width=12, background="darkblue", foreground="white", borderwidth=2
+        )
+        date_picker.pack(pady=5)
+
+        ttk.Label(dialog, text="Product:").pack(pady=5)
+        product_var = tk.StringVar()
+        product_combo = ttk.Combobox(
+            dialog,
+            textvariable=product_var,
+            values=[data["name"] for data in self.products.values()],
+        )
+        product_combo.pack(pady=5)
+
+        ttk.Label(dialog, text="Quantity:").pack(pady=5)
+        quantity_entry = ttk.Entry(dialog)
+        quantity_entry.pack(pady=5)
+
+        # Lines stay in the dialog until checkout; nothing touches the store
+        # before then.
+        lines = []
+        lines_list = tk.Listbox(dialog, height=8)
+
+        def add_line():
+            try:
+                quantity = int(quantity_entry.get())
+            except ValueError:
+                messagebox.showerror("Error", "Quantity must be a whole number")
+                return
+            if not product_var.get():
+                messagebox.showerror("Error", "Please select a product")
+                return
+            lines.append((product_var.get(), quantity))
+            lines_list.insert("end", f"{product_var.get()} x{quantity}")
+            quantity_entry.delete(0, "end")
+
+        def remove_line():
+            for index in reversed(lines_list.curselection()):
+                lines_list.delete(index)
+                del lines[index]
+
+        ttk.Button(dialog, text="Add Line", command=add_line).pack(pady=5)
+        lines_list.pack(fill="both", expand=True, padx=10, pady=5)
+        ttk.Button(dialog, text="Remove Line", command=remove_line).pack(pady=5)
+
+        def checkout():
+            try:
+                basket_id, transactions = self.store.record_basket(
+                    lines, date_picker.get_date()
+                )
+                self.after_change()
                 dialog.destroy()
 
                 messagebox.showinfo(
                     "Success",
-                    f"Sale recorded successfully!\n\n"
-                    f"Transaction ID: {transaction_id}\n"
-                    f"Product: {product_name}\n"
-                    f"Quantity: {quantity}\n"
-                    f"Total: Rp{total:,}",
+                    f"Basket recorded successfully!\n\n"
+                    f"Transaction ID: {basket_id}\n"
+                    + "".join(
+                        f"{transaction['product']} x{transaction['quantity']}: "
+                        f"Rp{transaction['total']:,}\n"
+                        for transaction in transactions
+                    )
+                    + "Total: Rp"
+                    + f"{sum(transaction['total'] for transaction in transactions):,}",
                 )
 
             except ValueError as e:
                 messagebox.showerror("Error", str(e))
 
-        ttk.Button(dialog, text="Save", command=save_sale).pack(pady=20)
+        ttk.Button(dialog, text="Checkout", command=checkout).pack(pady=20)
 
     def edit_selected_data(self):
         selection = self.products_tree.selection()
@@ -451,8 +606,7 @@ class Main:
             return
 
         item = selection[0]
-        values = self.products_tree.item(item)["values"]
-        product_id = values[0]
+        product_id = self.products_table.key(item)
 
         if product_id in self.products:
             self.edit_product(product_id)
@@ -490,35 +644,14 @@ class Main:
 
         def save_changes():
             try:
-                new_name = name_entry.get().strip()
-                new_price = Decimal(price_entry.get())
-                new_stock = int(stock_entry.get())
-
-                if not new_name:
-                    raise ValueError("Product name is required!")
-                if new_price <= 0:
-                    raise ValueError("Price must be positive")
-                if new_stock < 0:
-                    raise ValueError("Stock cannot be negative")
-
-                for pid, data in self.products.items():
-                    if pid != product_id and data["name"].lower() == new_name.lower():
-                        raise ValueError("Product with this name already exists!")
-
-                old_values = self.products[product_id].copy()
-                self.products[product_id].update(
-                    {"name": new_name, "price": new_price, "stock": new_stock}
-                )
-
-                self.log_action(
-                    f"Edited product ID: {product_id}\n"
-                    f"  Name: {old_values['name']} → {new_name}\n"
-                    f"  Price: Rp {old_values['price']:,} → Rp {new_price:,}\n"
-                    f"  Stock: {old_values['stock']} → {new_stock}"
+                self.store.edit_product(
+                    product_id,
+                    name_entry.get(),
+                    parse_money(price_entry.get()),
+                    int(stock_entry.get()),
                 )
-
                 self.refresh_product_list()
-                self.save_data()
+                self.after_change()
                 dialog.destroy()
                 messagebox.showinfo("Success", "Product updated successfully.")
 
@@ -533,15 +666,9 @@ class Main:
             return
 
         item = selection[0]
-        values = self.sales_tree.item(item)["values"]
-        transaction_id = values[0]
-
-        transaction = None
-        for t in self.transactions:
-            if t["id"] == transaction_id:
-                transaction = t
-                break
+        transaction_id = self.sales_table.key(item)
 
+        transaction = self.transactions.get(transaction_id)
         if not transaction:
             return
 
@@ -579,62 +706,13 @@ class Main:
 
         def save_changes():
             try:
-                new_product_name = product_var.get()
-                new_quantity = int(quantity_entry.get())
-                new_date = date_picker.get_date()
-
-                new_product_id = None
-                for pid, data in self.products.items():
-                    if data["name"] == new_product_name:
-                        new_product_id = pid
-                        break
-
-                if not new_product_id:
-                    raise ValueError("Please select a product")
-                if new_quantity <= 0:
-                    raise ValueError("Quantity must be positive")
-
-                old_product_id = transaction["product_id"]
-                self.products[old_product_id]["stock"] += transaction["quantity"]
-
-                current_stock = self.products[new_product_id]["stock"]
-                if new_quantity > current_stock:
-                    self.products[old_product_id]["stock"] -= transaction["quantity"]
-                    raise ValueError(
-                        f"Insufficient stock!\nRequested: {new_quantity}\nAvailable: {current_stock}"
-                    )
-
-                new_total = self.products[new_product_id]["price"] * new_quantity
-                self.products[new_product_id]["stock"] -= new_quantity
-
-                old_values = {
-                    "date": transaction["date"].strftime("%Y-%m-%d"),
-                    "product": transaction["product"],
-                    "quantity": transaction["quantity"],
-                    "total": transaction["total"],
-                }
-
-                transaction.update(
-                    {
-                        "date": new_date,
-                        "product_id": new_product_id,
-                        "product": new_product_name,
-                        "quantity": new_quantity,
-                        "total": new_total,
-                    }
-                )
-
-                self.log_action(
-                    f"Edited sale ID: {transaction_id}\n"
-                    f"  Date: {old_values['date']} → {new_date.strftime('%Y-%m-%d')}\n"
-                    f"  Product: {old_values['product']} → {new_product_name}\n"
-                    f"  Quantity: {old_values['quantity']} → {new_quantity}\n"
-                    f"  Total: Rp {old_values['total']:,} → Rp {new_total:,}"
+                self.store.edit_sale(
+                    transaction_id,
+                    product_var.get(),
+                    int(quantity_entry.get()),
+                    date_picker.get_date(),
                 )
-
-                self.refresh_product_list()
-                self.refresh_sales_list()
-                self.save_data()
+                self.after_change()
                 dialog.destroy()
                 messagebox.showinfo("Success", "Sale updated successfully!")
 
@@ -649,8 +727,7 @@ class Main:
             return
 
         item = selection[0]
-        values = self.products_tree.item(item)["values"]
-        product_id = values[0]
+        product_id = self.products_table.key(item)
 
         if product_id in self.products:
             product_data = self.products[product_id]
@@ -658,15 +735,8 @@ class Main:
                 "Confirm Deletion",
                 f"Are you sure you want to delete {product_data['name']}?",
             ):
-                self.log_action(
-                    f"Deleted product: {product_data['name']} "
-                    f"(ID: {product_id}, "
-                    f"Price: Rp {product_data['price']:,}, "
-                    f"Stock: {product_data['stock']})"
-                )
-                del self.products[product_id]
-                self.refresh_product_list()
-                self.save_data()
+                self.store.delete_product(product_id)
+                self.after_change()
                 messagebox.showinfo("Success", "Product deleted successfully!")
 
     def delete_selected_sale(self):
@@ -675,38 +745,16 @@ class Main:
             return
 
         item = selection[0]
-        values = self.sales_tree.item(item)["values"]
-        transaction_id = values[0]
-
-        transaction = None
-        for t in self.transactions:
-            if t["id"] == transaction_id:
-                transaction = t
-                break
+        transaction_id = self.sales_table.key(item)
 
+        transaction = self.transactions.get(transaction_id)
         if transaction:
             if messagebox.askyesno(
                 "Confirm Deletion",
                 f"Are you sure you want to delete this sale?\nTransaction ID: {transaction_id}",
             ):
-                # Restore product stock
-                product_id = transaction["product_id"]
-                self.products[product_id]["stock"] += transaction["quantity"]
-
-                # Remove transaction
-                self.transactions.remove(transaction)
-
-                self.log_action(
-                    f"Deleted sale: ID: {transaction_id}\n"
-                    f"  Product: {transaction['product']}\n"
-                    f"  Date: {transaction['date'].strftime('%Y-%m-%d')}\n"
-                    f"  Quantity: {transaction['quantity']}\n"
-                    f"  Total: Rp {transaction['total']:,}"
-                )
-
-                self.refresh_product_list()
-                self.refresh_sales_list()
-                self.save_data()
+                self.store.delete_sale(transaction_id)
+                self.after_change()
                 messagebox.showinfo("Success", "Sale deleted successfully!")
 
     def on_product_select(self, event):
@@ -727,57 +775,151 @@ class Main:
             self.edit_sale_button.config(state="disabled")
             self.delete_sale_button.config(state="disabled")
 
-    def refresh_product_list(self, event=None):
-        for item in self.products_tree.get_children():
-            self.products_tree.delete(item)
-
-        search_keyword = self.product_search_entry.get().strip().lower()
-
-        for product_id, data in self.products.items():
-            if search_keyword and search_keyword not in data["name"].lower():
-                continue
+    def format_product_row(self, product_id):
+        data = self.products[product_id]
+        return product_id, (
+            product_id,
+            data["name"],
+            f"Rp{data['price']:,}",
+            data["stock"],
+        )
 
-            self.products_tree.insert(
-                "",
-                "end",
-                values=(
-                    product_id,
-                    data["name"],
-                    f"Rp{data['price']:,}",
-                    data["stock"],
-                ),
-            )
+    def format_sale_row(self, transaction):
+        return transaction["id"], (
+            transaction["id"],
+            transaction["date"].strftime("%Y-%m-%d"),
+            transaction["product"],
+            transaction["quantity"],
+            f"Rp{transaction['total']:,}",
+        )
 
-    def refresh_sales_list(self, event=None):
-        for item in self.sales_tree.get_children():
-            self.sales_tree.delete(item)
+    def product_matches_search(self, product_id):
+        search_keyword = self.product_search_entry.get().strip().lower()
+        return self.store.search_index.product_matches(product_id, search_keyword)
 
+    def sale_matches_search(self, transaction):
         search_keyword = self.sales_search_entry.get().strip().lower()
+        return self.store.search_index.product_matches(
+            transaction["product_id"], search_keyword
+        )
 
-        sorted_transactions = sorted(
-            self.transactions, key=lambda x: x["date"], reverse=True
+    def sale_row_index(self, transaction):
+        rows = self.sales_table.rows
+        if not isinstance(rows, list):
+            return rows.index(transaction)
+        key = self.transactions.display_key
+        return bisect.bisect_left(rows, key(transaction), key=key)
+
+    def insert_sale_row(self, transaction):
+        # Call after the sale is in self.transactions. Without a search the
+        # table shows the store's live view, which already has the row.
+        rows = self.sales_table.rows
+        if isinstance(rows, list):
+            if not self.sale_matches_search(transaction):
+                return
+            rows.insert(self.sale_row_index(transaction), transaction)
+        self.sales_table.row_added(self.sale_row_index(transaction))
+
+    def remove_sale_row(self, transaction):
+        # Call before the sale leaves (or moves within) self.transactions.
+        rows = self.sales_table.rows
+        index = self.sale_row_index(transaction)
+        if isinstance(rows, list):
+            if index >= len(rows) or rows[index]["id"] != transaction["id"]:
+                return
+            del rows[index]
+        self.sales_table.row_removed(index, transaction["id"])
+
+    def show_search_error(self, error):
+        messagebox.showerror("Error", f"Search failed:\n{error}")
+
+    def prepare_product_search(self):
+        # Runs on the Tk thread: capture the keyword; the returned function
+        # queries the index on the search thread.
+        search_keyword = self.product_search_entry.get()
+        return lambda cancelled: self.store.search_products(search_keyword)
+
+    def prepare_sales_search(self):
+        search_keyword = self.sales_search_entry.get()
+        if not search_keyword.strip():
+            view = self.transactions.newest_first()
+            return lambda cancelled: view
+
+        return lambda cancelled: self.store.search_sales(search_keyword, cancelled)
+
+    def schedule_product_search(self, event=None):
+        self.search.schedule(
+            "products", self.prepare_product_search, self.products_table.set_rows
         )
 
-        for transaction in sorted_transactions:
-            if search_keyword and search_keyword not in transaction["product"].lower():
-                continue
+    def schedule_sales_search(self, event=None):
+        self.search.schedule(
+            "sales", self.prepare_sales_search, self.sales_table.set_rows
+        )
 
-            self.sales_tree.insert(
-                "",
-                "end",
-                values=(
-                    transaction["id"],
-                    transaction["date"].strftime("%Y-%m-%d"),
-                    transaction["product"],
-                    transaction["quantity"],
-                    f"Rp{transaction['total']:,}",
-                ),
+    def rerun_running_searches(self):
+        # A search still in flight was started from a snapshot taken before
+        # this change; restart it so its result does not drop the change.
+        if self.search.running("products"):
+            self.search.submit(
+                "products", self.prepare_product_search(), self.products_table.set_rows
             )
+        if self.search.running("sales"):
+            self.search.submit(
+                "sales", self.prepare_sales_search(), self.sales_table.set_rows
+            )
+
+    def refresh_product_list(self, event=None):
+        self.search.cancel("products")
+        self.products_table.set_rows(self.prepare_product_search()(lambda: False))
+
+    def refresh_sales_list(self, event=None):
+        self.search.cancel("sales")
+        self.sales_table.set_rows(self.prepare_sales_search()(lambda: False))
 
     def run(self):
         self.root.mainloop()
 
 
 if __name__ == "__main__":
-    app = Main()
+    parser = argparse.ArgumentParser(description="Inventory System")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument(
+        "--no-journal",
+        dest="journal",
+        action="store_false",
+        help="Rewrite the JSON snapshot on every change instead of journaling",
+    )
+    parser.add_argument(
+        "--compress-logs",
+        action="store_true",
+        help="Gzip the audit logs of finished days",
+    )
+    parser.add_argument(
+        "--no-snapshot",
+        dest="snapshots",
+        action="store_false",
+        help="Compact into products.json and sales.json instead of snapshot.bin",
+    )
+    parser.add_argument(
+        "--server",
+        default=None,
+        help="Use the inventory served by server.py at this URL",
+    )
+    parser.add_argument(
+        "--sales-file",
+        default=None,
+        help="Answer the Summary tab from a sales file written by sales_mmap.py "
+        "until the history has loaded",
+    )
+    args = parser.parse_args()
+
+    app = Main(
+        backend=args.backend,
+        journal=args.journal,
+        compress_logs=args.compress_logs,
+        snapshots=args.snapshots,
+        sales_file=args.sales_file,
+        server=args.server,
+    )
     app.run()
@@ -0,0 +1,39 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Amounts are whole rupiah held as plain ints, so prices, totals and
+# summaries are integer arithmetic. Text from the user or from files written
+# while amounts were Decimals goes through parse_money once, at the edge.
+#
+# Amounts, quantities and stock end up in 64-bit integer columns (the sales
+# store, snapshots, the sales file and SQLite), so anything outside that
+# range is rejected on the way in rather than failing halfway into a write.
+INT64_MIN = -(2**63)
+INT64_MAX = 2**63 - 1
+
+
+def check_int64(value, what="Amount"):
+    if not INT64_MIN <= value <= INT64_MAX:
+        raise ValueError(f"{what} is out of range: {value}")
+    return value
+
+
+def parse_money(value):
+    if isinstance(value, str):
+        try:
+            value = int(value)
+        except ValueError:
+            pass
+    if isinstance(value, int):
+        return check_int64(value)
+
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value!r}") from None
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount: {value!r}")
+    # Checked before rounding, which would spell out all the digits of
+    # something like "1e999999999".
+    if amount and amount.adjusted() > 18:
+        raise ValueError(f"Amount is out of range: {value}")
+    return check_int64(int(amount.to_integral_value(ROUND_HALF_UP)))
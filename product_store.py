@@ -0,0 +1,38 @@
+class ProductStore(dict):
+    # Products keyed by id, plus a case-folded name -> id index. Names are
+    # unique ignoring case, so the index answers both "which product is this
+    # name" and "is this name taken" without walking the catalogue. Renames
+    # must go through rename() to keep the index in step.
+    def __init__(self, products=()):
+        super().__init__()
+        self._by_name = {}
+        for product_id, data in dict(products).items():
+            self[product_id] = data
+
+    def __setitem__(self, product_id, data):
+        if product_id in self:
+            self._unindex(product_id)
+        super().__setitem__(product_id, data)
+        self._by_name[data["name"].casefold()] = product_id
+
+    def __delitem__(self, product_id):
+        self._unindex(product_id)
+        super().__delitem__(product_id)
+
+    def pop(self, product_id, *default):
+        if product_id in self:
+            self._unindex(product_id)
+        return super().pop(product_id, *default)
+
+    def _unindex(self, product_id):
+        key = self[product_id]["name"].casefold()
+        if self._by_name.get(key) == product_id:
+            del self._by_name[key]
+
+    def rename(self, product_id, name):
+        self._unindex(product_id)
+        self[product_id]["name"] = name
+        self._by_name[name.casefold()] = product_id
+
+    def find_id(self, name):
+        return self._by_name.get(name.strip().casefold())
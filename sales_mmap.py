@@ -0,0 +1,230 @@
+import os
+import sys
+import json
+import mmap
+import bisect
+import struct
+import argparse
+from datetime import date
+from storage import read_store
+from sales_store import add_totals, basket_of, name_summary
+
+# Read-only sales history as fixed-width records, for machines that only
+# report on it. The file is mapped rather than read, so opening it costs the
+# same for ten sales as for ten million and a range query touches only the
+# pages it needs.
+#
+#   header    magic, version, id width, record count, label table offset
+#             and length
+#   records   id (UTF-8, NUL padded to the id width), int32 day ordinal,
+#             int32 label, int64 quantity, int64 total; in date order
+#   labels    JSON list of [product_id, product name] the labels index
+MAGIC = b"INVSALE\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHHQQQ")
+
+
+def record_format(id_width):
+    return struct.Struct(f"<{id_width}siiqq")
+
+
+def write_sales_file(path, transactions):
+    ids, dates, labels, quantities, totals, label_table = transactions.columns()
+    encoded = [transaction_id.encode("utf-8") for transaction_id in ids]
+    id_width = max(map(len, encoded), default=1)
+    if any(b"\0" in transaction_id for transaction_id in encoded):
+        raise ValueError("Transaction IDs cannot contain NUL characters")
+    record = record_format(id_width)
+    label_data = json.dumps(label_table).encode("utf-8")
+    labels_offset = HEADER.size + record.size * len(ids)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(
+            HEADER.pack(
+                MAGIC, VERSION, id_width, len(ids), labels_offset, len(label_data)
+            )
+        )
+        pack = record.pack
+        batch = []
+        for row in zip(encoded, dates, labels, quantities, totals):
+            batch.append(pack(*row))
+            if len(batch) == 4096:
+                f.write(b"".join(batch))
+                batch.clear()
+        f.write(b"".join(batch))
+        f.write(label_data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class SalesFile:
+    # A sales file opened for reading. Rows are addressed by position in date
+    # order: row(index) unpacks one record, rows_between bisects the date
+    # field in place, and summary() walks the records of a date range
+    # straight out of the mapping.
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open()
+        except Exception:
+            self._map.close()
+            raise
+
+    def _open(self):
+        if len(self._map) < HEADER.size:
+            raise ValueError("Truncated sales file")
+        magic, version, id_width, count, labels_offset, labels_length = (
+            HEADER.unpack_from(self._map)
+        )
+        if magic != MAGIC:
+            raise ValueError("Not a sales file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported sales file version {version}")
+
+        self._record = record_format(id_width)
+        if (
+            labels_offset != HEADER.size + self._record.size * count
+            or labels_offset + labels_length != len(self._map)
+        ):
+            raise ValueError("Sales file length does not match its header")
+
+        self._id_width = id_width
+        self._count = count
+        self._records = memoryview(self._map)[HEADER.size : labels_offset]
+        self._labels = [
+            tuple(label)
+            for label in json.loads(self._map[labels_offset:].decode("utf-8"))
+        ]
+
+    def close(self):
+        if self._map.closed:
+            return
+        # The mapping cannot close while a view into it is alive.
+        self._records.release()
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def row(self, index):
+        if not 0 <= index < self._count:
+            raise IndexError("Sales file row out of range")
+        transaction_id, ordinal, label, quantity, total = self._record.unpack_from(
+            self._records, index * self._record.size
+        )
+        product_id, product = self._labels[label]
+        return {
+            "id": transaction_id.rstrip(b"\0").decode("utf-8"),
+            "date": date.fromordinal(ordinal),
+            "product_id": product_id,
+            "product": product,
+            "quantity": quantity,
+            "total": total,
+        }
+
+    __getitem__ = row
+
+    def ordinal(self, index):
+        (ordinal,) = struct.unpack_from(
+            "<i", self._records, index * self._record.size + self._id_width
+        )
+        return ordinal
+
+    def rows_between(self, start_date, end_date):
+        rows = range(self._count)
+        first = bisect.bisect_left(rows, start_date.toordinal(), key=self.ordinal)
+        last = bisect.bisect_right(rows, end_date.toordinal(), key=self.ordinal)
+        return range(first, max(first, last))
+
+    def between(self, start_date, end_date):
+        for index in self.rows_between(start_date, end_date):
+            yield self.row(index)
+
+    def summary(self, start_date, end_date):
+        # Same result as the storage backends' summary().
+        rows = self.rows_between(start_date, end_date)
+        return self.product_summary(self.label_totals(rows.start, rows.stop))
+
+    def transaction_count(self, start_date, end_date):
+        rows = self.rows_between(start_date, end_date)
+        return self.count_transactions(rows.start, rows.stop)
+
+    def count_transactions(self, start, stop):
+        # Sales in rows start..stop, a basket counting once per day it has
+        # lines on.
+        size = self._record.size
+        # Only the id and date of each record are unpacked.
+        ids = struct.Struct(f"<{self._id_width}si{size - self._id_width - 4}x")
+        transactions = set()
+        count = 0
+        day = None
+        for transaction_id, ordinal in ids.iter_unpack(
+            self._records[start * size : stop * size]
+        ):
+            if b"-" not in transaction_id:
+                count += 1
+                continue
+            if ordinal != day:
+                count += len(transactions)
+                transactions.clear()
+                day = ordinal
+            transaction_id = transaction_id.rstrip(b"\0").decode("utf-8")
+            transactions.add(basket_of(transaction_id) or transaction_id)
+        return count + len(transactions)
+
+    def label_totals(self, start, stop):
+        # {label: [quantity, total, count]} over rows start..stop.
+        size = self._record.size
+        # Only label, quantity and total are unpacked; the id and date are
+        # skipped as padding.
+        totals = struct.Struct(f"<{self._id_width + 4}xiqq")
+        by_label = {}
+        for label, quantity, total in totals.iter_unpack(
+            self._records[start * size : stop * size]
+        ):
+            add_totals(by_label, label, quantity, total)
+        return by_label
+
+    def product_summary(self, by_label):
+        # Label totals as a report, keyed by the product name on the sales.
+        labels = self._labels
+        return name_summary(
+            {labels[label]: entry for label, entry in by_label.items()}
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Write the sales history as a fixed-width sales file"
+    )
+    parser.add_argument("--directory", default="inventory")
+    parser.add_argument("--source", choices=["json", "sqlite"], default="json")
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Path of the sales file (defaults to sales.dat in --directory)",
+    )
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.join(args.directory, "sales.dat")
+    try:
+        _, transactions = read_store(args.source, args.directory)
+    except ValueError as e:
+        print(f"Not written: {e}", file=sys.stderr)
+        return 1
+    write_sales_file(output, transactions)
+    print(f"Wrote {len(transactions)} sales to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,585 @@
+import bisect
+import operator
+from array import array
+from itertools import chain
+from collections import Counter
+from datetime import date
+from collections.abc import Mapping
+from money import check_int64
+
+FIELDS = ("id", "date", "product_id", "product", "quantity", "total")
+
+
+def line_id(basket_id, line):
+    # Each line item of a basket sale is a sale of its own, "<basket>-<n>".
+    return f"{basket_id}-{line}"
+
+
+def basket_of(transaction_id):
+    basket_id, separator, line = transaction_id.partition("-")
+    return basket_id if separator and line.isdigit() else None
+
+
+def add_totals(by_label, label, quantity, total, count=1):
+    # Adds one sale, or `count` sales' worth of totals, to the
+    # [quantity, total, count] kept for `label`.
+    entry = by_label.get(label)
+    if entry is None:
+        by_label[label] = [quantity, total, count]
+    else:
+        entry[0] += quantity
+        entry[1] += total
+        entry[2] += count
+
+
+def merge_totals(by_label, totals):
+    # add_totals for every entry of another {label: [quantity, total,
+    # count]}, without a call per entry, which made summaries over the
+    # daily rollups about three times slower.
+    for label, (quantity, total, count) in totals.items():
+        entry = by_label.get(label)
+        if entry is None:
+            by_label[label] = [quantity, total, count]
+        else:
+            entry[0] += quantity
+            entry[1] += total
+            entry[2] += count
+
+
+def name_summary(by_label):
+    # Reports group by the product name as it appeared on the sales, so a
+    # renamed product shows up under each of its names.
+    product_summary = {}
+    for (_, name), (quantity, total, count) in by_label.items():
+        data = product_summary.setdefault(
+            name, {"quantity": 0, "total": 0, "count": 0}
+        )
+        data["quantity"] += quantity
+        data["total"] += total
+        data["count"] += count
+    return product_summary
+
+
+class SalesStore:
+    # Sales stored column by column: typed arrays for the date ordinal,
+    # recording sequence, quantity, total and (product id, product name)
+    # label, a list for ids, and an id -> row dict for O(1) lookup. A sale
+    # costs a few array slots instead of a dict with six boxed values, and
+    # the product name on a sale is a small int into a shared label table.
+    # Callers see sales as SaleRow mappings over their row.
+    #
+    # `_day_rows` holds each day's rows in recording (sequence) order, and
+    # `_days` the days with sales, ascending. A date range is two bisects
+    # into `_days`, and the Sales tab reads rows newest first through a view
+    # that maps positions onto the days without sorting anything. Adding,
+    # moving or removing a sale only shifts rows within its day, so it costs
+    # the same whatever the length of the history.
+    #
+    # Alongside each day the store keeps a rollup per label (quantity,
+    # revenue and number of sales), so a summary costs days x products in
+    # range rather than one step per sale.
+    # Line items of basket sales are counted per basket and day as well, so
+    # the number of transactions in a range costs one step per day too.
+    #
+    # `touched_days` collects the day ordinals that add, update and remove
+    # have changed (both days when a sale moves), for storage that saves by
+    # date; the owner clears it once those days are written.
+    def __init__(self, transactions=()):
+        self._ids = []
+        self._dates = array("i")
+        self._seqs = array("q")
+        self._labels = array("i")
+        self._quantities = array("q")
+        self._totals = array("q")
+        self._label_table = []
+        self._label_index = {}
+        self._rows = {}
+        self._free = []
+        self._next_seq = 0
+
+        self._days = []
+        self._day_rows = {}
+        self._offsets = None
+        self._rollups = {}
+        self._baskets = {}
+        self.touched_days = set()
+        self.extend(transactions)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __iter__(self):
+        # Date order; sales from the same day in recording order.
+        for row in self._ordered():
+            yield SaleRow(self, row)
+
+    def __contains__(self, transaction_id):
+        return transaction_id in self._rows
+
+    def get(self, transaction_id):
+        row = self._rows.get(transaction_id)
+        return None if row is None else SaleRow(self, row)
+
+    def _ordered(self, start_date=None, end_date=None):
+        # Rows in iteration order, optionally only those dated
+        # start_date..end_date.
+        days = self._days
+        if start_date is not None:
+            days = self._days_between(start_date, end_date)
+        return chain.from_iterable(map(self._day_rows.__getitem__, days))
+
+    def records(self, start_date=None, end_date=None):
+        # Plain dicts in iteration order, optionally only those dated
+        # start_date..end_date, for writing them out.
+        order = self._ordered(start_date, end_date)
+        ids = self._ids
+        dates = self._dates
+        labels = self._labels
+        label_table = self._label_table
+        quantities = self._quantities
+        totals = self._totals
+        days = {}
+        for row in order:
+            ordinal = dates[row]
+            day = days.get(ordinal)
+            if day is None:
+                day = days[ordinal] = date.fromordinal(ordinal)
+            product_id, product = label_table[labels[row]]
+            yield {
+                "id": ids[row],
+                "date": day,
+                "product_id": product_id,
+                "product": product,
+                "quantity": quantities[row],
+                "total": totals[row],
+            }
+
+    def columns(self):
+        # (ids, date ordinals, labels, quantities, totals) in iteration
+        # order, plus the label table: the raw material of a binary snapshot.
+        order = array("q", self._ordered())
+        return (
+            [self._ids[row] for row in order],
+            array("i", map(self._dates.__getitem__, order)),
+            array("i", map(self._labels.__getitem__, order)),
+            array("q", map(self._quantities.__getitem__, order)),
+            array("q", map(self._totals.__getitem__, order)),
+            list(self._label_table),
+        )
+
+    @classmethod
+    def from_columns(cls, ids, dates, labels, quantities, totals, label_table):
+        # Inverse of columns(). The arrays are adopted as they are, so
+        # loading a snapshot is a handful of whole-column operations plus one
+        # pass for the rollups.
+        count = len(ids)
+        if not len(dates) == len(labels) == len(quantities) == len(totals) == count:
+            raise ValueError("Sales columns differ in length")
+        if labels and not 0 <= min(labels) <= max(labels) < len(label_table):
+            raise ValueError("Sales label out of range")
+
+        store = cls()
+        store._ids = ids
+        store._dates = dates
+        store._labels = labels
+        store._quantities = quantities
+        store._totals = totals
+        store._label_table = [tuple(label) for label in label_table]
+        store._label_index = {
+            label: index for index, label in enumerate(store._label_table)
+        }
+        store._rows = dict(zip(ids, range(count)))
+        if len(store._rows) != count:
+            raise ValueError("Duplicate transaction ID in sales columns")
+        store._seqs = array("q", range(1, count + 1))
+        store._next_seq = count
+
+        rows = range(count)
+        if any(map(operator.gt, dates, dates[1:])):
+            # Stable, so each day's rows stay in column (sequence) order.
+            rows = array("q", sorted(rows, key=dates.__getitem__))
+        counts = Counter(dates)
+        store._days = sorted(counts)
+        start = 0
+        for ordinal in store._days:
+            stop = start + counts[ordinal]
+            store._day_rows[ordinal] = array("q", rows[start:stop])
+            start = stop
+        store.rebuild_rollups()
+        return store
+
+    def ids_by_product(self):
+        # {product_id: (product name on its first sale, set of sale ids)},
+        # gathered per label in one pass for building the search index.
+        ids = self._ids
+        labels = self._labels
+        by_label = {}
+        for row in self._ordered():
+            label = labels[row]
+            sale_ids = by_label.get(label)
+            if sale_ids is None:
+                sale_ids = by_label[label] = []
+            sale_ids.append(ids[row])
+
+        by_product = {}
+        for label, sale_ids in by_label.items():
+            product_id, product = self._label_table[label]
+            entry = by_product.get(product_id)
+            if entry is None:
+                by_product[product_id] = (product, set(sale_ids))
+            else:
+                entry[1].update(sale_ids)
+        return by_product
+
+    def _label(self, product_id, product):
+        key = (product_id, product)
+        label = self._label_index.get(key)
+        if label is None:
+            label = self._label_index[key] = len(self._label_table)
+            self._label_table.append(key)
+        return label
+
+    def _check(self, values):
+        # Before any column changes: a value array("q") cannot hold would
+        # fail halfway and leave the columns of different lengths.
+        if "quantity" in values:
+            check_int64(values["quantity"], "Quantity")
+        if "total" in values:
+            check_int64(values["total"], "Total")
+
+    def add(self, transaction):
+        if transaction["id"] in self._rows:
+            raise ValueError(f"Duplicate transaction ID: {transaction['id']}")
+        self._check(transaction)
+        self._next_seq += 1
+        values = (
+            transaction["id"],
+            transaction["date"].toordinal(),
+            self._next_seq,
+            self._label(transaction["product_id"], transaction["product"]),
+            transaction["quantity"],
+            transaction["total"],
+        )
+        columns = (
+            self._ids,
+            self._dates,
+            self._seqs,
+            self._labels,
+            self._quantities,
+            self._totals,
+        )
+        if self._free:
+            row = self._free.pop()
+            for column, value in zip(columns, values):
+                column[row] = value
+        else:
+            row = len(self._ids)
+            for column, value in zip(columns, values):
+                column.append(value)
+
+        self._rows[transaction["id"]] = row
+        self._place(row)
+        self._roll(row, 1)
+        return SaleRow(self, row)
+
+    def extend(self, transactions):
+        # Bulk version of add() for loading: rows are appended column by
+        # column, and each onto the end of its day's rows.
+        ids = self._ids
+        dates = self._dates
+        append_id = ids.append
+        append_date = dates.append
+        append_seq = self._seqs.append
+        append_label = self._labels.append
+        append_quantity = self._quantities.append
+        append_total = self._totals.append
+        label_table = self._label_table
+        label_index = self._label_index
+        rows = self._rows
+        day_rows = self._day_rows
+        rollups = self._rollups
+        next_seq = self._next_seq
+        try:
+            for transaction in transactions:
+                transaction_id = transaction["id"]
+                if transaction_id in rows:
+                    raise ValueError(f"Duplicate transaction ID: {transaction_id}")
+                ordinal = transaction["date"].toordinal()
+                product_id = transaction["product_id"]
+                product = transaction["product"]
+                quantity = transaction["quantity"]
+                total = transaction["total"]
+
+                label = label_index.get((product_id, product))
+                if label is None:
+                    label = self._label(product_id, product)
+                # Keep the label table's strings so the decoded copies go.
+                product_id, product = label_table[label]
+
+                next_seq += 1
+                row = len(ids)
+                rows[transaction_id] = row
+                append_id(transaction_id)
+                append_date(ordinal)
+                append_seq(next_seq)
+                append_label(label)
+                append_quantity(quantity)
+                append_total(total)
+
+                if ordinal in day_rows:
+                    day_rows[ordinal].append(row)
+                else:
+                    day_rows[ordinal] = array("q", (row,))
+                    rollups[ordinal] = {}
+
+                add_totals(rollups[ordinal], label, quantity, total)
+
+                if "-" in transaction_id:
+                    self._count_line(transaction_id, ordinal, 1)
+        finally:
+            self._next_seq = next_seq
+            self._days = sorted(day_rows)
+            self._offsets = None
+
+    def update(self, transaction_id, changes):
+        self._check(changes)
+        row = self._rows[transaction_id]
+        self._roll(row, -1)
+        if "date" in changes and changes["date"].toordinal() != self._dates[row]:
+            self._unplace(row)
+            self._dates[row] = changes["date"].toordinal()
+            self._place(row)
+
+        product_id, product = self._label_table[self._labels[row]]
+        self._labels[row] = self._label(
+            changes.get("product_id", product_id), changes.get("product", product)
+        )
+        if "quantity" in changes:
+            self._quantities[row] = changes["quantity"]
+        if "total" in changes:
+            self._totals[row] = changes["total"]
+        self._roll(row, 1)
+        return SaleRow(self, row)
+
+    def remove(self, transaction_id):
+        # Returns the sale as a plain dict: its row is free for reuse.
+        row = self._rows[transaction_id]
+        transaction = dict(SaleRow(self, row))
+        self._roll(row, -1)
+        self._unplace(row)
+        del self._rows[transaction_id]
+        self._ids[row] = None
+        self._free.append(row)
+        return transaction
+
+    def sequence(self, transaction):
+        row = self._rows.get(transaction["id"])
+        return 0 if row is None else self._seqs[row]
+
+    def display_key(self, transaction):
+        # Newest first; sales from the same day stay in recording order.
+        return -transaction["date"].toordinal(), self.sequence(transaction)
+
+    def select(self, transaction_ids):
+        # Rows for the given sales, newest first. Ids no longer in the store
+        # are skipped, so a search racing an edit cannot fail here.
+        dates = self._dates
+        seqs = self._seqs
+        rows = [row for row in map(self._rows.get, transaction_ids) if row is not None]
+        rows.sort(key=lambda row: (-dates[row], seqs[row]))
+        return [SaleRow(self, row) for row in rows]
+
+    def _place(self, row):
+        ordinal = self._dates[row]
+        day = self._day_rows.get(ordinal)
+        if day is None:
+            self._day_rows[ordinal] = array("q", (row,))
+            bisect.insort(self._days, ordinal)
+        else:
+            # New sales have the highest sequence; only a sale moved from
+            # another day can land in the middle.
+            seqs = self._seqs
+            seq = seqs[row]
+            if seqs[day[-1]] < seq:
+                day.append(row)
+            else:
+                day.insert(bisect.bisect_left(day, seq, key=seqs.__getitem__), row)
+        self._offsets = None
+
+    def _unplace(self, row):
+        ordinal = self._dates[row]
+        day = self._day_rows[ordinal]
+        seqs = self._seqs
+        del day[bisect.bisect_left(day, seqs[row], key=seqs.__getitem__)]
+        if not day:
+            del self._day_rows[ordinal]
+            del self._days[bisect.bisect_left(self._days, ordinal)]
+        self._offsets = None
+
+    def _roll(self, row, sign):
+        ordinal = self._dates[row]
+        self.touched_days.add(ordinal)
+        if "-" in self._ids[row]:
+            self._count_line(self._ids[row], ordinal, sign)
+        label = self._labels[row]
+        day = self._rollups.setdefault(ordinal, {})
+        entry = day.get(label)
+        if entry is None:
+            entry = day[label] = [0, 0, 0]
+        entry[0] += sign * self._quantities[row]
+        entry[1] += sign * self._totals[row]
+        entry[2] += sign
+        if not entry[2]:
+            del day[label]
+            if not day:
+                del self._rollups[ordinal]
+
+    def _count_line(self, transaction_id, ordinal, sign):
+        basket_id = basket_of(transaction_id)
+        if basket_id is None:
+            return
+        day = self._baskets.setdefault(ordinal, {})
+        lines = day.get(basket_id, 0) + sign
+        if lines:
+            day[basket_id] = lines
+        else:
+            del day[basket_id]
+            if not day:
+                del self._baskets[ordinal]
+
+    def rebuild_rollups(self):
+        ids = self._ids
+        self._baskets = {}
+        rollups = self._rollups = {}
+        for ordinal, rows in self._day_rows.items():
+            for row in rows:
+                if "-" in ids[row]:
+                    self._count_line(ids[row], ordinal, 1)
+            day = rollups[ordinal] = {}
+            for label, quantity, total in zip(
+                map(self._labels.__getitem__, rows),
+                map(self._quantities.__getitem__, rows),
+                map(self._totals.__getitem__, rows),
+            ):
+                add_totals(day, label, quantity, total)
+
+    def days(self):
+        # Ordinals of the days with sales, ascending.
+        return list(self._days)
+
+    def _days_between(self, start_date, end_date):
+        first = bisect.bisect_left(self._days, start_date.toordinal())
+        last = bisect.bisect_right(self._days, end_date.toordinal())
+        return self._days[first:last]
+
+    def daily_rollups(self, start_date, end_date):
+        # (day ordinal, (product_id, product name), [quantity, total, count]),
+        # the building block for daily, weekly or monthly views.
+        label_table = self._label_table
+        for ordinal in self._days_between(start_date, end_date):
+            for label, entry in self._rollups[ordinal].items():
+                yield ordinal, label_table[label], entry
+
+    def product_totals(self, start_date, end_date):
+        # {(product_id, product name): [quantity, total, count]}.
+        by_label = {}
+        for ordinal in self._days_between(start_date, end_date):
+            merge_totals(by_label, self._rollups[ordinal])
+        label_table = self._label_table
+        return {label_table[label]: entry for label, entry in by_label.items()}
+
+    def summary(self, start_date, end_date):
+        return name_summary(self.product_totals(start_date, end_date))
+
+    def transaction_count(self, start_date, end_date):
+        # Sales in range, a basket counting once per day it has lines on.
+        count = 0
+        for ordinal in self._days_between(start_date, end_date):
+            count += len(self._day_rows[ordinal])
+            day = self._baskets.get(ordinal)
+            if day:
+                count -= sum(day.values()) - len(day)
+        return count
+
+    def _day_offsets(self):
+        # Running row counts per day, newest day first. Rebuilt lazily after a
+        # change, which costs one pass over the days, not over the sales.
+        if self._offsets is None:
+            offsets = [0]
+            for ordinal in reversed(self._days):
+                offsets.append(offsets[-1] + len(self._day_rows[ordinal]))
+            self._offsets = offsets
+        return self._offsets
+
+    def newest_first(self):
+        return SalesView(self)
+
+    def row_at(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        offsets = self._day_offsets()
+        day = bisect.bisect_right(offsets, index) - 1
+        ordinal = self._days[len(self._days) - 1 - day]
+        return SaleRow(self, self._day_rows[ordinal][index - offsets[day]])
+
+    def position(self, transaction):
+        row = self._rows[transaction["id"]]
+        ordinal = self._dates[row]
+        seqs = self._seqs
+        day = len(self._days) - 1 - bisect.bisect_left(self._days, ordinal)
+        within = bisect.bisect_left(
+            self._day_rows[ordinal], seqs[row], key=seqs.__getitem__
+        )
+        return self._day_offsets()[day] + within
+
+
+class SaleRow(Mapping):
+    # One sale as a read-only mapping over its row in a SalesStore. Values
+    # are read from the columns on every access, so the row follows edits to
+    # the sale; after the sale is removed its row may be reused.
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, field):
+        store = self.store
+        row = self.row
+        if field == "id":
+            return store._ids[row]
+        if field == "date":
+            return date.fromordinal(store._dates[row])
+        if field == "product_id":
+            return store._label_table[store._labels[row]][0]
+        if field == "product":
+            return store._label_table[store._labels[row]][1]
+        if field == "quantity":
+            return store._quantities[row]
+        if field == "total":
+            return store._totals[row]
+        raise KeyError(field)
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __repr__(self):
+        return f"SaleRow({dict(self)!r})"
+
+
+class SalesView:
+    # Live, read-only sequence over a SalesStore in newest-first order.
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, index):
+        return self.store.row_at(index)
+
+    def index(self, transaction):
+        return self.store.position(transaction)
@@ -0,0 +1,230 @@
+import sys
+import queue
+import threading
+import traceback
+
+
+class SearchCancelled(Exception):
+    pass
+
+
+def report_error(error):
+    traceback.print_exception(error, file=sys.stderr)
+
+
+class SearchWorker:
+    # Runs search jobs on a background thread. Every job belongs to a channel
+    # ("products", "sales"); submitting to a channel supersedes whatever is
+    # queued or running there, and only the newest result is delivered. Results
+    # come back through a queue polled with root.after, so callbacks always run
+    # on the Tk thread.
+    def __init__(self, root, delay=250, poll_interval=20, on_error=None):
+        self.root = root
+        self.delay = delay
+        self.poll_interval = poll_interval
+        # Called on the Tk thread with the exception of a search that failed.
+        self.on_error = on_error or report_error
+
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._latest = {}
+        self._timers = {}
+        self._polling = False
+        self._generation = 0
+
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def schedule(self, channel, prepare, callback):
+        # Debounce: restart the timer on every keystroke and only build the
+        # snapshot and submit the job once typing pauses.
+        if channel in self._timers:
+            self.root.after_cancel(self._timers[channel])
+        self._timers[channel] = self.root.after(
+            self.delay, lambda: self.submit(channel, prepare(), callback)
+        )
+
+    def submit(self, channel, func, callback):
+        if channel in self._timers:
+            self.root.after_cancel(self._timers.pop(channel))
+        self._generation += 1
+        self._latest[channel] = self._generation
+        self._jobs.put((channel, self._generation, func, callback))
+        if not self._polling:
+            self._polling = True
+            self.root.after(self.poll_interval, self.poll)
+
+    def running(self, channel):
+        return channel in self._latest
+
+    def cancel(self, channel):
+        if channel in self._timers:
+            self.root.after_cancel(self._timers.pop(channel))
+        self._latest.pop(channel, None)
+
+    def is_current(self, channel, generation):
+        return self._latest.get(channel) == generation
+
+    def run(self):
+        while True:
+            channel, generation, func, callback = self._jobs.get()
+            if not self.is_current(channel, generation):
+                continue
+
+            def cancelled():
+                return not self.is_current(channel, generation)
+
+            try:
+                result = func(cancelled)
+            except SearchCancelled:
+                continue
+            except Exception as e:
+                # Handed to the Tk thread like a result, so this thread lives
+                # on for the next search and the channel stops waiting.
+                self._results.put((channel, generation, self.on_error, e))
+                continue
+            self._results.put((channel, generation, callback, result))
+
+    def poll(self):
+        while True:
+            try:
+                channel, generation, callback, result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if self.is_current(channel, generation):
+                del self._latest[channel]
+                callback(result)
+
+        if self._latest:
+            self.root.after(self.poll_interval, self.poll)
+        else:
+            self._polling = False
+
+
+class NgramIndex:
+    # Inverted index from every substring of up to `n` characters to the keys
+    # whose text contains it. Longer queries intersect their n-grams and then
+    # confirm the full substring against the stored, already lower-cased text.
+    def __init__(self, n=3):
+        self.n = n
+        self.texts = {}
+        self.postings = {}
+
+    def grams(self, text, size=None):
+        grams = set()
+        for length in range(1, self.n + 1) if size is None else (size,):
+            for start in range(len(text) - length + 1):
+                grams.add(text[start : start + length])
+        return grams
+
+    def add(self, key, text):
+        text = text.lower()
+        self.texts[key] = text
+        for gram in self.grams(text):
+            self.postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key):
+        text = self.texts.pop(key, None)
+        if text is None:
+            return
+        for gram in self.grams(text):
+            keys = self.postings[gram]
+            keys.discard(key)
+            if not keys:
+                del self.postings[gram]
+
+    def update(self, key, text):
+        if self.texts.get(key) != text.lower():
+            self.remove(key)
+            self.add(key, text)
+
+    def search(self, query):
+        query = query.lower()
+        postings = [
+            self.postings.get(gram, ())
+            for gram in self.grams(query, min(len(query), self.n))
+        ]
+        if not postings:
+            return set(self.texts)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for keys in postings[1:]:
+            candidates.intersection_update(keys)
+        if len(query) > self.n:
+            candidates = {key for key in candidates if query in self.texts[key]}
+        return candidates
+
+
+class SearchIndex:
+    # Product names go into one n-gram index keyed by product id. Sales are
+    # found through the products they belong to, so a sales search is a name
+    # lookup joined against the product -> sale ids index. A deleted product
+    # keeps its name in the index while it still has sales.
+    #
+    # Searches run on the search thread while the Tk thread changes the
+    # index, so both hold `lock` around anything that touches its dicts and
+    # sets. Reads on the Tk thread, the only one that writes, need no lock.
+    def __init__(self):
+        self.names = NgramIndex()
+        self.product_order = {}
+        self.sales_by_product = {}
+        self.lock = threading.Lock()
+        self._next = 0
+
+    def build(self, products, transactions):
+        for product_id, data in products.items():
+            self.add_product(product_id, data["name"])
+        for product_id, (product, sale_ids) in transactions.ids_by_product().items():
+            if product_id not in self.names.texts:
+                self.names.add(product_id, product)
+            self.sales_by_product[product_id] = sale_ids
+
+    def add_product(self, product_id, name):
+        with self.lock:
+            self.names.update(product_id, name)
+            self._next += 1
+            self.product_order[product_id] = self._next
+
+    def rename_product(self, product_id, name):
+        with self.lock:
+            self.names.update(product_id, name)
+
+    def remove_product(self, product_id):
+        with self.lock:
+            del self.product_order[product_id]
+            if not self.sales_by_product.get(product_id):
+                self.names.remove(product_id)
+
+    def add_sale(self, transaction):
+        with self.lock:
+            self.sales_by_product.setdefault(transaction["product_id"], set()).add(
+                transaction["id"]
+            )
+
+    def remove_sale(self, transaction):
+        with self.lock:
+            sales = self.sales_by_product[transaction["product_id"]]
+            sales.discard(transaction["id"])
+            if not sales and transaction["product_id"] not in self.product_order:
+                self.names.remove(transaction["product_id"])
+
+    def product_matches(self, product_id, keyword):
+        return keyword in self.names.texts.get(product_id, "")
+
+    def find_products(self, keyword):
+        with self.lock:
+            if not keyword:
+                return list(self.product_order)
+            matches = self.names.search(keyword)
+            order = self.product_order
+            return sorted((pid for pid in matches if pid in order), key=order.get)
+
+    def find_sales(self, keyword, cancelled, sales):
+        # Only the id lookup holds the lock; select() copes with sales that
+        # change or go while it runs.
+        matches = []
+        with self.lock:
+            for product_id in self.names.search(keyword):
+                if cancelled():
+                    raise SearchCancelled
+                matches.extend(self.sales_by_product.get(product_id, ()))
+        return sales.select(matches)
@@ -0,0 +1,315 @@
+import re
+import sys
+import json
+import argparse
+import threading
+from collections import OrderedDict
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlsplit
+from money import parse_money
+from storage import encode_value
+from inventory_store import InventoryStore
+from csv_import import COLUMNS, import_rows
+
+# One process owns the inventory and every register talks to it over a small
+# JSON API on localhost, so writes are serialized in one place and clients
+# never load or save the files themselves.
+#
+#   GET    /state                     version, products, sale count
+#   GET    /version                   {"version": n}
+#   GET    /products?q=               matching product ids, in list order
+#   POST   /products                  {name, price, stock}
+#   PUT    /products/<id>             {name, price, stock}
+#   DELETE /products/<id>
+#   GET    /sales?q=&start=&limit=    a page of sales, newest first
+#   GET    /sales/<id>
+#   POST   /sales                     {product, quantity, date}
+#   PUT    /sales/<id>                {product, quantity, date}
+#   DELETE /sales/<id>
+#   POST   /baskets                   {date, lines: [[product, quantity], ...]}
+#   POST   /import                    {kind, source, rows: [[line, {column: value}]]}
+#   GET    /summary?start=&end=       the InventoryStore.summary report
+#
+# Every change bumps the version and answers with the new version and the
+# products it touched. Rejected requests answer 400 (404 for unknown ids)
+# with {"error": message}.
+DEFAULT_PORT = 8765
+PAGE_LIMIT = 1000
+SEARCH_CACHE_SIZE = 8
+
+
+class NotFound(LookupError):
+    pass
+
+
+def parse_day(text):
+    try:
+        return date.fromisoformat(text)
+    except (TypeError, ValueError):
+        raise ValueError("Dates must be written as YYYY-MM-DD") from None
+
+
+def product_fields(body):
+    return str(body["name"]), parse_money(body["price"]), int(body["stock"])
+
+
+def sale_fields(body):
+    return str(body["product"]), int(body["quantity"]), parse_day(body["date"])
+
+
+def basket_fields(body):
+    try:
+        lines = [(str(product), int(quantity)) for product, quantity in body["lines"]]
+    except (TypeError, ValueError):
+        raise ValueError("Basket lines must be [product, quantity] pairs") from None
+    return lines, parse_day(body["date"])
+
+
+class InventoryServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, store):
+        super().__init__(address, RequestHandler)
+        self.store = store
+        self.version = 0
+        # The store is not thread-safe; requests are handled on their own
+        # threads but take turns with it, including encoding the answer
+        # from the live rows.
+        self.lock = threading.Lock()
+        self._searches = OrderedDict()
+
+        self.routes = [
+            ("GET", "/state", self.get_state),
+            ("GET", "/version", lambda query: {"version": self.version}),
+            ("GET", "/products", self.find_products),
+            ("POST", "/products", self.add_product),
+            ("PUT", "/products/(?P<id>[^/]+)", self.edit_product),
+            ("DELETE", "/products/(?P<id>[^/]+)", self.delete_product),
+            ("GET", "/sales", self.find_sales),
+            ("GET", "/sales/(?P<id>[^/]+)", self.get_sale),
+            ("POST", "/sales", self.record_sale),
+            ("PUT", "/sales/(?P<id>[^/]+)", self.edit_sale),
+            ("DELETE", "/sales/(?P<id>[^/]+)", self.delete_sale),
+            ("POST", "/baskets", self.record_basket),
+            ("POST", "/import", self.import_rows),
+            ("GET", "/summary", self.summary),
+        ]
+        self.routes = [
+            (method, re.compile(pattern + "$"), handler)
+            for method, pattern, handler in self.routes
+        ]
+
+    def dispatch(self, method, path, query, body):
+        # Returns (status, payload text).
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match is None or route_method != method:
+                continue
+            args = {name: unquote(value) for name, value in match.groupdict().items()}
+            if method in ("POST", "PUT"):
+                args["body"] = body
+            try:
+                with self.lock:
+                    return 200, json.dumps(handler(query, **args), default=encode_value)
+            except NotFound as e:
+                return 404, json.dumps({"error": str(e)})
+            except KeyError as e:
+                return 400, json.dumps({"error": f"Missing field: {e.args[0]}"})
+            except (TypeError, ValueError) as e:
+                return 400, json.dumps({"error": str(e)})
+        return 404, json.dumps({"error": f"No such endpoint: {method} {path}"})
+
+    def changed(self, *product_ids):
+        self.version += 1
+        self._searches.clear()
+        return {
+            "version": self.version,
+            "products": {
+                product_id: self.store.products.get(product_id)
+                for product_id in product_ids
+            },
+        }
+
+    def product(self, product_id):
+        if product_id not in self.store.products:
+            raise NotFound(f"Unknown product ID: {product_id}")
+        return product_id
+
+    def sale(self, transaction_id):
+        transaction = self.store.transactions.get(transaction_id)
+        if transaction is None:
+            raise NotFound(f"Unknown transaction ID: {transaction_id}")
+        return transaction
+
+    def get_state(self, query):
+        return {
+            "version": self.version,
+            "products": self.store.products,
+            "sales": len(self.store.transactions),
+        }
+
+    def find_products(self, query):
+        return {"ids": self.store.search_products(query.get("q", ""))}
+
+    def add_product(self, query, body):
+        product_id = self.store.add_product(*product_fields(body))
+        return dict(self.changed(product_id), id=product_id)
+
+    def edit_product(self, query, id, body):
+        self.store.edit_product(self.product(id), *product_fields(body))
+        return self.changed(id)
+
+    def delete_product(self, query, id):
+        self.store.delete_product(self.product(id))
+        return self.changed(id)
+
+    def find_sales(self, query):
+        keyword = query.get("q", "").strip().lower()
+        start = max(0, int(query.get("start", 0)))
+        limit = min(PAGE_LIMIT, max(0, int(query.get("limit", 100))))
+
+        # Paging through a search must not run it again for every page.
+        rows = self._searches.get(keyword)
+        if rows is None:
+            rows = self.store.search_sales(keyword)
+            self._searches[keyword] = rows
+            if len(self._searches) > SEARCH_CACHE_SIZE:
+                self._searches.popitem(last=False)
+        else:
+            self._searches.move_to_end(keyword)
+
+        end = min(len(rows), start + limit)
+        return {
+            "version": self.version,
+            "count": len(rows),
+            "sales": [rows[index] for index in range(start, end)],
+        }
+
+    def get_sale(self, query, id):
+        return self.sale(id)
+
+    def record_sale(self, query, body):
+        transaction = self.store.record_sale(*sale_fields(body))
+        return dict(self.changed(transaction["product_id"]), sale=transaction)
+
+    def edit_sale(self, query, id, body):
+        old_product_id = self.sale(id)["product_id"]
+        transaction = self.store.edit_sale(id, *sale_fields(body))
+        return dict(
+            self.changed(old_product_id, transaction["product_id"]), sale=transaction
+        )
+
+    def delete_sale(self, query, id):
+        self.sale(id)
+        transaction = self.store.delete_sale(id)
+        return dict(self.changed(transaction["product_id"]), sale=transaction)
+
+    def record_basket(self, query, body):
+        basket_id, transactions = self.store.record_basket(*basket_fields(body))
+        product_ids = [transaction["product_id"] for transaction in transactions]
+        return dict(self.changed(*product_ids), id=basket_id, sales=transactions)
+
+    def import_rows(self, query, body):
+        # Rows of a CSV file read by the client, applied in one batch as a
+        # local import would be; see csv_import.py.
+        kind = body["kind"]
+        if kind not in COLUMNS:
+            raise ValueError(f"Unknown import kind: {kind}")
+        rows = [(int(line), dict(row)) for line, row in body["rows"]]
+        imported, errors = import_rows(self.store, kind, rows, str(body["source"]))
+        # An import can touch any number of products; send them all.
+        return dict(
+            self.changed(*self.store.products), imported=imported, errors=errors
+        )
+
+    def summary(self, query):
+        return self.store.summary(
+            parse_day(query.get("start")), parse_day(query.get("end"))
+        )
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so registers keep one connection open instead of paying a
+    # TCP handshake per request. Headers and body go out in separate writes;
+    # without TCP_NODELAY the second one waits on the client's delayed ACK.
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def handle_request(self, method):
+        url = urlsplit(self.path)
+        query = dict(parse_qsl(url.query))
+        body = None
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            try:
+                body = json.loads(self.rfile.read(length))
+            except ValueError:
+                self.respond(400, json.dumps({"error": "Request body is not JSON"}))
+                return
+        if method in ("POST", "PUT") and not isinstance(body, dict):
+            self.respond(400, json.dumps({"error": "Expected a JSON object"}))
+            return
+        self.respond(*self.server.dispatch(method, url.path, query, body))
+
+    def respond(self, status, text):
+        data = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    def do_PUT(self):
+        self.handle_request("PUT")
+
+    def do_DELETE(self):
+        self.handle_request("DELETE")
+
+    def log_message(self, format, *args):
+        # Every change is already in the audit log; a line per request would
+        # only slow a busy server down.
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the inventory to registers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--directory", default="inventory")
+    parser.add_argument("--logs", default="logs")
+    parser.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    parser.add_argument("--no-journal", dest="journal", action="store_false")
+    parser.add_argument("--no-snapshot", dest="snapshots", action="store_false")
+    parser.add_argument("--compress-logs", action="store_true")
+    args = parser.parse_args(argv)
+
+    store = InventoryStore(
+        args.directory,
+        args.logs,
+        backend=args.backend,
+        journal=args.journal,
+        compress_logs=args.compress_logs,
+        snapshots=args.snapshots,
+    )
+    store.load()
+    server = InventoryServer((args.host, args.port), store)
+    print(f"Serving {args.directory} on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        with server.lock:
+            store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
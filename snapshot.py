@@ -0,0 +1,139 @@
+import os
+import sys
+import json
+import zlib
+import struct
+from array import array
+from sales_store import SalesStore
+from product_store import ProductStore
+
+# Binary checkpoint of the whole inventory. After the header comes a payload
+# of length-prefixed sections:
+#   products      JSON object, as in products.json
+#   labels        JSON list of [product_id, product name]
+#   ids           sale ids, UTF-8, separated by NUL
+#   dates         int32 day ordinals
+#   sale labels   int32 indexes into labels
+#   quantities    int64
+#   totals        int64 whole rupiah
+# Columns are little-endian and in date order, so loading one is a few bulk
+# copies instead of parsing and converting every sale.
+MAGIC = b"INVSNAP\0"
+VERSION = 1
+HEADER = struct.Struct("<8sHQQI")
+SECTION = struct.Struct("<Q")
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def _column_bytes(column):
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _column(typecode, data):
+    column = array(typecode)
+    if len(data) % column.itemsize:
+        raise SnapshotError("Truncated column")
+    column.frombytes(data)
+    if sys.byteorder == "big":
+        column.byteswap()
+    return column
+
+
+def write_snapshot(path, products, transactions, generation):
+    ids, dates, labels, quantities, totals, label_table = transactions.columns()
+    id_blob = "\0".join(ids).encode("utf-8")
+    if ids and id_blob.count(b"\0") != len(ids) - 1:
+        raise ValueError("Transaction IDs cannot contain NUL characters")
+
+    sections = [
+        json.dumps(products).encode("utf-8"),
+        json.dumps(label_table).encode("utf-8"),
+        id_blob,
+        _column_bytes(dates),
+        _column_bytes(labels),
+        _column_bytes(quantities),
+        _column_bytes(totals),
+    ]
+    checksum = 0
+    chunks = []
+    for section in sections:
+        prefix = SECTION.pack(len(section))
+        checksum = zlib.crc32(section, zlib.crc32(prefix, checksum))
+        chunks += (prefix, section)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        size = sum(map(len, chunks))
+        f.write(HEADER.pack(MAGIC, VERSION, generation, size, checksum))
+        for chunk in chunks:
+            f.write(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_generation(path):
+    # The generation from the header, or None if the file is not a snapshot.
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+    except OSError:
+        return None
+    if len(header) != HEADER.size:
+        return None
+    magic, version, generation, _, _ = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        return None
+    return generation
+
+
+def read_snapshot(path):
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+        if len(header) != HEADER.size:
+            raise SnapshotError("Truncated header")
+        magic, version, generation, length, checksum = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise SnapshotError("Not an inventory snapshot")
+        if version != VERSION:
+            raise SnapshotError(f"Unsupported snapshot version {version}")
+        payload = f.read(length + 1)
+    if len(payload) != length:
+        raise SnapshotError("Snapshot length does not match its header")
+    if zlib.crc32(payload) != checksum:
+        raise SnapshotError("Snapshot checksum mismatch")
+
+    sections = []
+    offset = 0
+    view = memoryview(payload)
+    while offset < length:
+        if offset + SECTION.size > length:
+            raise SnapshotError("Unexpected snapshot layout")
+        (size,) = SECTION.unpack_from(payload, offset)
+        offset += SECTION.size
+        sections.append(view[offset : offset + size])
+        offset += size
+    if len(sections) != 7 or offset != length:
+        raise SnapshotError("Unexpected snapshot layout")
+
+    product_data, label_data, id_data, dates, labels, quantities, totals = sections
+    products = ProductStore(json.loads(bytes(product_data)))
+    ids = bytes(id_data).decode("utf-8").split("\0") if len(id_data) else []
+    try:
+        transactions = SalesStore.from_columns(
+            ids,
+            _column("i", dates),
+            _column("i", labels),
+            _column("q", quantities),
+            _column("q", totals),
+            json.loads(bytes(label_data)),
+        )
+    except ValueError as e:
+        raise SnapshotError(str(e)) from None
+    return generation, products, transactions
@@ -0,0 +1,671 @@
+import os
+import sys
+import json
+import sqlite3
+import argparse
+from datetime import date
+from collections.abc import Mapping
+from money import parse_money
+from snapshot import read_generation, read_snapshot, write_snapshot
+from sales_store import SalesStore
+from product_store import ProductStore
+
+# Compact once the journal holds at least this many records, or as many
+# records as there are sales, whichever is larger. Growing the threshold with
+# the data keeps the amortized cost of a mutation constant.
+COMPACT_MIN_RECORDS = 1000
+
+
+_dates = {}
+
+
+def parse_date(text):
+    # Sales cluster on a few thousand distinct days, so cache the parsed
+    # dates; a miss splits the fixed-width ISO string instead of going
+    # through strptime and its locale handling.
+    value = _dates.get(text)
+    if value is None:
+        if len(text) != 10 or text[4] != "-" or text[7] != "-":
+            raise ValueError(f"Invalid date: {text!r}")
+        value = _dates[text] = date(int(text[:4]), int(text[5:7]), int(text[8:]))
+    return value
+
+
+def decode_product(data):
+    data["price"] = parse_money(data["price"])
+    return data
+
+
+def decode_sale(transaction):
+    transaction["date"] = parse_date(transaction["date"])
+    transaction["total"] = parse_money(transaction["total"])
+    return transaction
+
+
+def encode_value(value):
+    # json.dump fallback: dates as text, sale rows as objects.
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+
+def month_of(ordinal):
+    day = date.fromordinal(ordinal)
+    return f"{day.year:04d}-{day.month:02d}"
+
+
+def month_bounds(month):
+    year, month = map(int, month.split("-"))
+    first = date(year, month, 1)
+    following = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return first, date.fromordinal(following.toordinal() - 1)
+
+
+def write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, default=encode_value)
+    os.replace(tmp_path, path)
+
+
+def write_records(path, records):
+    # A JSON array with one record per line. It is still plain JSON, and
+    # read_records can convert it row by row without holding the whole text.
+    encode = json.JSONEncoder(default=encode_value).encode
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write("[")
+        separator = "\n"
+        for record in records:
+            f.write(separator + encode(record))
+            separator = ",\n"
+        f.write("\n]\n")
+    os.replace(tmp_path, path)
+
+
+def read_records(path, chunk_size=1 << 16):
+    # Decodes about chunk_size bytes of whole lines at a time: far fewer
+    # decoder calls than one per line, and the full text is never in memory.
+    decode = json.JSONDecoder().decode
+    with open(path, "r") as f:
+        if f.readline().strip() != "[":
+            # Written as a single line before snapshots were line-delimited.
+            f.seek(0)
+            yield from json.load(f)
+            return
+        while True:
+            lines = f.readlines(chunk_size)
+            if not lines:
+                break
+            text = "".join(lines).rstrip()
+            if text.endswith("]"):
+                text = text[:-1].rstrip()
+            text = text.rstrip(",")
+            if text:
+                yield from decode("[" + text + "]")
+
+
+class JsonStorage:
+    # The JSON format is products.json plus one file of sales per month in
+    # sales/, listed in sales/manifest.json; a single sales.json from before
+    # partitioning is still read. Saving rewrites only the months with
+    # changed sales and then swaps in a new manifest, so until the manifest
+    # is replaced the previous files are all still there and consistent.
+    #
+    # With snapshots on, compaction writes a binary checkpoint
+    # (snapshot.bin) instead, and keeps the previous checkpoint together with
+    # the journal written on top of it; if the newest checkpoint is damaged,
+    # the one before it plus both journals rebuild the same state. Each
+    # journal starts with the generation it applies to, the JSON files
+    # counting as generation 0. Without a journal every change is saved
+    # straight into its month partitions.
+    def __init__(self, directory="inventory", journal=True, snapshots=True):
+        self.directory = directory
+        self.products_path = os.path.join(directory, "products.json")
+        self.sales_path = os.path.join(directory, "sales.json")
+        self.partitions_path = os.path.join(directory, "sales")
+        self.manifest_path = os.path.join(self.partitions_path, "manifest.json")
+        self.journal_path = os.path.join(directory, "journal.log")
+        self.previous_journal_path = os.path.join(directory, "journal.prev.log")
+        self.snapshot_path = os.path.join(directory, "snapshot.bin")
+        self.previous_snapshot_path = os.path.join(directory, "snapshot.prev.bin")
+        self.journal = journal
+        self.snapshots = snapshots
+
+        self.products = ProductStore()
+        self.transactions = SalesStore()
+        self.generation = 0
+        self.pending = 0
+        self.manifest = {"revision": 0, "partitions": {}}
+        # False until the month partitions on disk hold everything except
+        # the days in transactions.touched_days.
+        self._partitions_current = False
+        self._journal_file = None
+
+    def load(self):
+        # Read even when a snapshot has the data: the next save of the
+        # partitions must know which files are in use.
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r") as f:
+                self.manifest = json.load(f)
+
+        if not self.load_snapshot():
+            self.load_json()
+            self.generation = self.replay_journals(0)
+        return self.products, self.transactions
+
+    def load_json(self):
+        if os.path.exists(self.products_path):
+            with open(self.products_path, "r") as f:
+                self.products = ProductStore(
+                    (product_id, decode_product(data))
+                    for product_id, data in json.load(f).items()
+                )
+
+        if os.path.exists(self.manifest_path):
+            # Months in order, so the sales arrive in date order.
+            paths = [
+                os.path.join(self.partitions_path, partition["file"])
+                for _, partition in sorted(self.manifest["partitions"].items())
+            ]
+            self.transactions = SalesStore(
+                decode_sale(transaction)
+                for path in paths
+                for transaction in read_records(path)
+            )
+            self._partitions_current = True
+        elif os.path.exists(self.sales_path):
+            self.transactions = SalesStore(
+                decode_sale(transaction)
+                for transaction in read_records(self.sales_path)
+            )
+
+    def load_snapshot(self):
+        candidates = []
+        for path in [self.snapshot_path, self.previous_snapshot_path]:
+            generation = read_generation(path)
+            if generation is not None:
+                candidates.append((generation, path))
+        candidates.sort(reverse=True)
+
+        for number, (generation, path) in enumerate(candidates):
+            try:
+                _, self.products, self.transactions = read_snapshot(path)
+            except (OSError, ValueError) as e:
+                print(f"Skipping damaged snapshot {path}: {e}", file=sys.stderr)
+                continue
+
+            self.generation = self.replay_journals(generation)
+            if path != self.snapshot_path:
+                # Rebuilt from the older checkpoint; replace the damaged one,
+                # or the one a crash mid-checkpoint left unrenamed.
+                self.compact()
+            return True
+        return False
+
+    def replay_journals(self, generation):
+        # The previous journal leads from `generation` to the next one and
+        # the current journal continues from there. A current journal that
+        # does not fit is set aside rather than appended to. Returns the
+        # generation the current journal applies to.
+        for path in [self.previous_journal_path, self.journal_path]:
+            if not os.path.exists(path):
+                continue
+            if self.replay(path, generation):
+                if path == self.previous_journal_path:
+                    generation += 1
+            elif path == self.journal_path:
+                os.replace(path, path + ".skipped")
+                print(
+                    f"Set aside {path}: it does not apply to generation {generation}",
+                    file=sys.stderr,
+                )
+        return generation
+
+    def replay(self, path, generation):
+        sales = self.transactions
+
+        # Byte offset just past the last whole record.
+        end = 0
+        with open(path, "rb") as f:
+            for number, line in enumerate(f):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-append; everything
+                    # before it was flushed whole.
+                    break
+                end += len(line)
+
+                if number == 0:
+                    if record.get("generation") != generation:
+                        return False
+                    continue
+
+                for product_id, data in record.get("products", {}).items():
+                    if data is None:
+                        self.products.pop(product_id, None)
+                    else:
+                        self.products[product_id] = decode_product(data)
+
+                for transaction_id, data in record.get("sales", {}).items():
+                    if data is None:
+                        if transaction_id in sales:
+                            sales.remove(transaction_id)
+                    elif transaction_id in sales:
+                        sales.update(transaction_id, decode_sale(data))
+                    else:
+                        sales.add(decode_sale(data))
+
+                if path == self.journal_path:
+                    self.pending += 1
+
+        if path == self.journal_path:
+            self.cut_torn_tail(path, end)
+        return True
+
+    def cut_torn_tail(self, path, end):
+        # The next commit appends to this journal; anything after the last
+        # whole record would otherwise run into the new line and hide it,
+        # and every record after it, from the next load.
+        if end == 0:
+            # Not even the header made it; commit() starts a fresh journal.
+            os.remove(path)
+            return
+        with open(path, "r+b") as f:
+            f.truncate(end)
+            f.seek(end - 1)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    def commit(self, products=None, sales=None):
+        if not self.journal:
+            self.compact()
+            return
+
+        record = {}
+        if products:
+            record["products"] = products
+        if sales:
+            record["sales"] = sales
+
+        if self._journal_file is None:
+            fresh = not os.path.exists(self.journal_path)
+            self._journal_file = open(self.journal_path, "a", encoding="utf-8")
+            if fresh:
+                header = {"generation": self.generation}
+                self._journal_file.write(json.dumps(header) + "\n")
+        self._journal_file.write(json.dumps(record, default=encode_value) + "\n")
+        self._journal_file.flush()
+        self.pending += 1
+
+        if self.pending >= max(COMPACT_MIN_RECORDS, len(self.transactions)):
+            self.compact()
+
+    def compact(self):
+        if self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+
+        if self.snapshots and self.journal:
+            self.write_checkpoint()
+        else:
+            self.write_partitions()
+            # The JSON files are generation 0 again, so any checkpoint and
+            # journal are now stale.
+            for path in [
+                self.snapshot_path,
+                self.previous_snapshot_path,
+                self.journal_path,
+                self.previous_journal_path,
+            ]:
+                if os.path.exists(path):
+                    os.remove(path)
+            self.generation = 0
+        self.pending = 0
+
+    def write_partitions(self):
+        write_json(self.products_path, self.products)
+        os.makedirs(self.partitions_path, exist_ok=True)
+
+        partitions = dict(self.manifest["partitions"])
+        if self._partitions_current:
+            months = {month_of(ordinal) for ordinal in self.transactions.touched_days}
+        else:
+            months = set(partitions)
+            months.update(map(month_of, self.transactions.days()))
+
+        # New files get the new revision in their name, so nothing the
+        # current manifest points at is overwritten.
+        revision = self.manifest["revision"] + 1
+        for month in sorted(months):
+            first, last = month_bounds(month)
+            sales = list(self.transactions.records(first, last))
+            if sales:
+                name = f"{month}.{revision}.json"
+                write_records(os.path.join(self.partitions_path, name), sales)
+                partitions[month] = {"file": name, "count": len(sales)}
+            else:
+                partitions.pop(month, None)
+
+        self.manifest = {
+            "revision": revision,
+            "partitions": dict(sorted(partitions.items())),
+        }
+        write_json(self.manifest_path, self.manifest)
+        self.transactions.touched_days.clear()
+        self._partitions_current = True
+
+        # Replaced partitions, and any left over by an interrupted save.
+        keep = {partition["file"] for partition in partitions.values()}
+        keep.add(os.path.basename(self.manifest_path))
+        for name in os.listdir(self.partitions_path):
+            if name not in keep:
+                os.remove(os.path.join(self.partitions_path, name))
+        if os.path.exists(self.sales_path):
+            os.remove(self.sales_path)
+
+    def write_checkpoint(self):
+        # The new checkpoint is whole on disk before anything is rotated, and
+        # each journal names the generation it applies to, so a crash between
+        # any two of these steps still loads to the same state.
+        generation = self.generation + 1
+        new_path = self.snapshot_path + ".new"
+        write_snapshot(new_path, self.products, self.transactions, generation)
+
+        if os.path.exists(self.snapshot_path):
+            os.replace(self.snapshot_path, self.previous_snapshot_path)
+        if os.path.exists(self.journal_path):
+            os.replace(self.journal_path, self.previous_journal_path)
+        elif os.path.exists(self.previous_journal_path):
+            os.remove(self.previous_journal_path)
+        os.replace(new_path, self.snapshot_path)
+        self.generation = generation
+
+    def close(self):
+        if self.pending:
+            self.compact()
+        elif self._journal_file is not None:
+            self._journal_file.close()
+            self._journal_file = None
+
+    def summary(self, start_date, end_date):
+        return self.transactions.summary(start_date, end_date)
+
+    def product_totals(self, start_date, end_date):
+        return self.transactions.product_totals(start_date, end_date)
+
+    def transaction_count(self, start_date, end_date):
+        return self.transactions.transaction_count(start_date, end_date)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    price INTEGER NOT NULL,
+    stock INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sales (
+    id TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    product_id TEXT NOT NULL,
+    product TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    total INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sales_date ON sales (date);
+"""
+
+
+class SqliteStorage:
+    def __init__(self, directory="inventory", filename="inventory.db"):
+        self.directory = directory
+        self.path = os.path.join(directory, filename)
+        # load() may run on a background thread while the window comes up;
+        # the app never uses the connection from two threads at once.
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SQLITE_SCHEMA)
+
+        self.products = ProductStore()
+        self.transactions = SalesStore()
+
+    def load(self):
+        for product_id, name, price, stock in self.conn.execute(
+            "SELECT id, name, price, stock FROM products ORDER BY rowid"
+        ):
+            self.products[product_id] = {
+                "name": name,
+                "price": price,
+                "stock": stock,
+            }
+
+        self.transactions = SalesStore(
+            self.sale_from_row(row)
+            for row in self.conn.execute(
+                "SELECT id, date, product_id, product, quantity, total "
+                "FROM sales ORDER BY rowid"
+            )
+        )
+        return self.products, self.transactions
+
+    def sale_from_row(self, row):
+        transaction_id, sale_date, product_id, product, quantity, total = row
+        return {
+            "id": transaction_id,
+            "date": parse_date(sale_date),
+            "product_id": product_id,
+            "product": product,
+            "quantity": quantity,
+            "total": total,
+        }
+
+    def commit(self, products=None, sales=None):
+        with self.conn:
+            self.write_rows(products, sales)
+
+    def write_rows(self, products=None, sales=None):
+        for product_id, data in (products or {}).items():
+            if data is None:
+                self.conn.execute("DELETE FROM products WHERE id = ?", (product_id,))
+            else:
+                self.conn.execute(
+                    "INSERT INTO products (id, name, price, stock) "
+                    "VALUES (?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                    "name = excluded.name, price = excluded.price, "
+                    "stock = excluded.stock",
+                    (product_id, data["name"], data["price"], data["stock"]),
+                )
+
+        for transaction_id, data in (sales or {}).items():
+            if data is None:
+                self.conn.execute("DELETE FROM sales WHERE id = ?", (transaction_id,))
+            else:
+                self.conn.execute(
+                    "INSERT INTO sales "
+                    "(id, date, product_id, product, quantity, total) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (id) DO UPDATE SET "
+                    "date = excluded.date, product_id = excluded.product_id, "
+                    "product = excluded.product, quantity = excluded.quantity, "
+                    "total = excluded.total",
+                    (
+                        transaction_id,
+                        data["date"].strftime("%Y-%m-%d"),
+                        data["product_id"],
+                        data["product"],
+                        data["quantity"],
+                        data["total"],
+                    ),
+                )
+
+    def compact(self):
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        self.conn.execute("PRAGMA optimize")
+        self.conn.close()
+
+    def summary(self, start_date, end_date):
+        product_summary = {}
+        for product, quantity, total, count in self.conn.execute(
+            "SELECT product, SUM(quantity), SUM(total), COUNT(*) "
+            "FROM sales WHERE date BETWEEN ? AND ? "
+            "GROUP BY product ORDER BY MIN(rowid)",
+            (start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")),
+        ):
+            product_summary[product] = {
+                "quantity": quantity,
+                "total": total,
+                "count": count,
+            }
+        return product_summary
+
+    def transaction_count(self, start_date, end_date):
+        # The line items of a basket sale share the id before "-<line>" (see
+        # sales_store.basket_of), and a basket counts once per day it has
+        # lines on, as in the other backends.
+        (count,) = self.conn.execute(
+            "SELECT COUNT(*) FROM ("
+            "  SELECT DISTINCT date, basket, CASE WHEN basket "
+            "    THEN substr(id, 1, instr(id, '-') - 1) ELSE id END"
+            "  FROM ("
+            "    SELECT id, date, instr(id, '-') > 0 "
+            "      AND substr(id, instr(id, '-') + 1) <> '' "
+            "      AND substr(id, instr(id, '-') + 1) NOT GLOB '*[^0-9]*' AS basket"
+            "    FROM sales WHERE date BETWEEN ? AND ?"
+            "  )"
+            ")",
+            (start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")),
+        ).fetchone()
+        return count
+
+    def import_data(self, products, transactions):
+        with self.conn:
+            self.conn.execute("DELETE FROM products")
+            self.conn.execute("DELETE FROM sales")
+            self.write_rows(
+                products=products,
+                sales={t["id"]: t for t in transactions},
+            )
+
+
+def open_storage(backend="json", directory="inventory", journal=True, snapshots=True):
+    if backend == "json":
+        return JsonStorage(directory, journal=journal, snapshots=snapshots)
+    if backend == "sqlite":
+        return SqliteStorage(directory)
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def migrate_json_to_sqlite(directory="inventory", force=False):
+    # import_data replaces everything in the database, so one that already
+    # holds data is only overwritten when asked to.
+    products, transactions = JsonStorage(directory).load()
+    storage = SqliteStorage(directory)
+    try:
+        (in_use,) = storage.conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM products) OR EXISTS (SELECT 1 FROM sales)"
+        ).fetchone()
+        if in_use and not force:
+            raise ValueError(f"{storage.path} already holds data")
+        storage.import_data(products, transactions)
+    finally:
+        storage.close()
+    return len(products), len(transactions)
+
+
+# Files whose presence marks a directory as holding live inventory data.
+DATA_FILES = [
+    "products.json",
+    "sales.json",
+    "sales",
+    "journal.log",
+    "snapshot.bin",
+    "inventory.db",
+]
+
+
+def read_store(source, directory):
+    # Loads the store in `directory` for reading only, so a register may
+    # keep running on it: never creates a database, and never closes a
+    # JSON store, which would compact the replayed journal.
+    if source == "sqlite":
+        if not os.path.exists(os.path.join(directory, "inventory.db")):
+            raise ValueError(f"There is no database in {directory}")
+        storage = SqliteStorage(directory)
+        try:
+            return storage.load()
+        finally:
+            storage.close()
+    return JsonStorage(directory).load()
+
+
+def export_store(source, directory, output):
+    # Writes products.json and sales.json to `output` from the store in
+    # `directory`. Never writes into a data directory, whose JSON files a
+    # journal may still be replayed over.
+    if os.path.abspath(output) == os.path.abspath(directory) or any(
+        os.path.exists(os.path.join(output, name)) for name in DATA_FILES
+    ):
+        raise ValueError(f"{output} already holds inventory data")
+
+    products, transactions = read_store(source, directory)
+    if not products and not len(transactions):
+        raise ValueError(f"The {source} store in {directory} is empty")
+
+    os.makedirs(output, exist_ok=True)
+    write_json(os.path.join(output, "products.json"), products)
+    write_records(os.path.join(output, "sales.json"), transactions.records())
+    return len(products), len(transactions)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inventory storage tools")
+    parser.add_argument("command", choices=["migrate", "export"])
+    parser.add_argument("--directory", default="inventory")
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="New directory for exported JSON files (required for export)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Let migrate replace a database that already holds data",
+    )
+    parser.add_argument(
+        "--source",
+        choices=["sqlite", "json"],
+        default="sqlite",
+        help="Store to export from; json reads the snapshot and journals",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "migrate":
+        try:
+            product_count, sale_count = migrate_json_to_sqlite(
+                args.directory, force=args.force
+            )
+        except ValueError as e:
+            print(f"Not migrated: {e}", file=sys.stderr)
+            return 1
+        print(f"Migrated {product_count} products and {sale_count} sales")
+        return 0
+
+    if args.output is None:
+        parser.error("export needs --output")
+    try:
+        product_count, sale_count = export_store(
+            args.source, args.directory, args.output
+        )
+    except ValueError as e:
+        print(f"Not exported: {e}", file=sys.stderr)
+        return 1
+    print(f"Exported {product_count} products and {sale_count} sales to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+from collections import OrderedDict
+from datetime import timedelta
+from sales_store import merge_totals, name_summary
+from storage import month_of, month_bounds
+
+# Upper bound on what cached summaries may hold. Entries are sized by
+# their number of products, at what one product was measured to take in a
+# report and in a month's totals; a month of a 2,000-product shop is about
+# 0.3 MiB.
+SUMMARY_CACHE_BYTES = 32 * 1024 * 1024
+REPORT_PRODUCT_BYTES = 256
+MONTH_PRODUCT_BYTES = 144
+
+
+def summarize(source, start_date, end_date):
+    if start_date > end_date:
+        raise ValueError("Start date cannot be after end date.")
+
+    product_summary = source.summary(start_date, end_date)
+    return {
+        "transactions": source.transaction_count(start_date, end_date),
+        "total": sum(data["total"] for data in product_summary.values()),
+        "products": product_summary,
+    }
+
+
+def month_pieces(start_date, end_date):
+    # (first, last, whole month?) for each month start_date..end_date touches.
+    first = start_date
+    while first <= end_date:
+        month_end = month_bounds(month_of(first.toordinal()))[1]
+        last = min(end_date, month_end)
+        yield first, last, first.day == 1 and last == month_end
+        first = last + timedelta(days=1)
+
+
+class SummaryCache:
+    # Summary reports by (start, end), for data at one version: the owner
+    # passes a number it bumps on every change, and a new number drops
+    # everything cached for the old one. Least recently used entries go
+    # first once the cache grows past max_bytes.
+    #
+    # Sources with product_totals() are also cached a calendar month at a
+    # time, so a range overlapping earlier ones only computes the months
+    # not seen yet and its partial months at either end. Sales on different
+    # days never share a transaction, so month counts add up exactly.
+    def __init__(self, max_bytes=SUMMARY_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.month_hits = 0
+        self.month_misses = 0
+        self.bytes = 0
+        self._entries = OrderedDict()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "month_hits": self.month_hits,
+            "month_misses": self.month_misses,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+        }
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+
+    def summary(self, source, start_date, end_date, version):
+        if start_date > end_date:
+            raise ValueError("Start date cannot be after end date.")
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+        key = ("range", start_date, end_date)
+        report = self.get(key)
+        if report is None:
+            self.misses += 1
+            report = self.compute(source, start_date, end_date)
+            self.put(
+                key, report, REPORT_PRODUCT_BYTES * (1 + len(report["products"]))
+            )
+        else:
+            self.hits += 1
+
+        # Callers own what they get back; the cached report stays as it was.
+        return {
+            "transactions": report["transactions"],
+            "total": report["total"],
+            "products": {
+                name: dict(data) for name, data in report["products"].items()
+            },
+        }
+
+    def compute(self, source, start_date, end_date):
+        pieces = list(month_pieces(start_date, end_date))
+        if not hasattr(source, "product_totals") or not any(
+            whole for _, _, whole in pieces
+        ):
+            return summarize(source, start_date, end_date)
+
+        # Merged oldest piece first, so products come out in the order of
+        # their first sale, as in a summary computed in one go.
+        by_label = {}
+        transactions = 0
+        for first, last, whole in pieces:
+            if whole:
+                totals, count = self.month(source, first)
+            else:
+                totals = source.product_totals(first, last)
+                count = source.transaction_count(first, last)
+            transactions += count
+            merge_totals(by_label, totals)
+
+        product_summary = name_summary(by_label)
+        return {
+            "transactions": transactions,
+            "total": sum(data["total"] for data in product_summary.values()),
+            "products": product_summary,
+        }
+
+    def month(self, source, first):
+        key = ("month", first)
+        block = self.get(key)
+        if block is None:
+            self.month_misses += 1
+            last = month_bounds(month_of(first.toordinal()))[1]
+            # Never changed once cached: compute() merges into lists of its
+            # own.
+            block = (
+                source.product_totals(first, last),
+                source.transaction_count(first, last),
+            )
+            self.put(key, block, MONTH_PRODUCT_BYTES * (1 + len(block[0])))
+        else:
+            self.month_hits += 1
+        return block
@@ -0,0 +1,124 @@
+import os
+import multiprocessing
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
+from sales_mmap import SalesFile
+from sales_store import merge_totals
+
+# Below this many sales in range a summary runs in the calling process;
+# handing partitions to other processes costs more than it saves.
+PARALLEL_MIN_ROWS = 200_000
+
+# Workers are started from a fresh process rather than forked from the app,
+# which has other threads running by then (search, audit log, loader): a
+# fork could copy a lock one of them holds. Windows has only spawn.
+if "forkserver" in multiprocessing.get_all_start_methods():
+    START_METHOD = "forkserver"
+else:
+    START_METHOD = "spawn"
+
+# Each worker maps the sales file itself, so only row bounds go out and
+# per-label totals come back.
+_worker_sales = None
+
+
+def _open_worker(path):
+    global _worker_sales
+    _worker_sales = SalesFile(path)
+
+
+def _label_totals(start, stop):
+    return _worker_sales.label_totals(start, stop)
+
+
+def _count_transactions(start, stop):
+    return _worker_sales.count_transactions(start, stop)
+
+
+def month_starts(start_date, end_date):
+    # The first day of every month after start_date's, up to end_date.
+    year, month = start_date.year, start_date.month
+    while True:
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        first = date(year, month, 1)
+        if first > end_date:
+            return
+        yield first
+
+
+class SummaryEngine:
+    # Summaries over a sales file (see sales_mmap.py) that split long ranges
+    # into partitions of whole months and aggregate them in a process pool.
+    # It has the storage-style summary(), so it can stand wherever a
+    # SalesFile does.
+    def __init__(self, path, workers=None, min_rows=PARALLEL_MIN_ROWS):
+        self.path = path
+        self.sales = SalesFile(path)
+        self.workers = workers or os.cpu_count() or 1
+        self.min_rows = min_rows
+        self._pool = None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self.sales.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def pool(self):
+        # Started on the first large summary, not when the file is opened.
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context(START_METHOD),
+                initializer=_open_worker,
+                initargs=(self.path,),
+            )
+        return self._pool
+
+    def partitions(self, start_date, end_date, count):
+        # About `count` row ranges covering start_date..end_date, cut only at
+        # month boundaries. Rows are in date order, so each boundary is one
+        # bisect, and busy and quiet months even out within a range.
+        rows = self.sales.rows_between(start_date, end_date)
+        target = len(rows) / count
+        partitions = []
+        start = rows.start
+        for first in month_starts(start_date, end_date):
+            boundary = self.sales.rows_between(first, end_date).start
+            if boundary > start and boundary - start >= target:
+                partitions.append((start, boundary))
+                start = boundary
+        if start < rows.stop:
+            partitions.append((start, rows.stop))
+        return partitions
+
+    def parallel(self, start_date, end_date):
+        # Whether a range is worth the pool.
+        rows = self.sales.rows_between(start_date, end_date)
+        return len(rows) >= max(self.min_rows, 1) and self.workers > 1
+
+    def summary(self, start_date, end_date):
+        if not self.parallel(start_date, end_date):
+            return self.sales.summary(start_date, end_date)
+
+        # Two partitions per worker, so one slow partition does not leave
+        # the others idle for long.
+        starts, stops = zip(*self.partitions(start_date, end_date, self.workers * 2))
+        by_label = {}
+        for partial in self.pool().map(_label_totals, starts, stops):
+            merge_totals(by_label, partial)
+        return self.sales.product_summary(by_label)
+
+    def transaction_count(self, start_date, end_date):
+        if not self.parallel(start_date, end_date):
+            return self.sales.transaction_count(start_date, end_date)
+        # Partitions end at month boundaries, so no day, and no basket's
+        # lines on a day, are split between two of them.
+        starts, stops = zip(*self.partitions(start_date, end_date, self.workers * 2))
+        return sum(self.pool().map(_count_transactions, starts, stops))
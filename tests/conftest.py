@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, next to main_FP3.py.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inventory_store import InventoryStore  # noqa: E402
+
+
+@pytest.fixture
+def open_store(tmp_path):
+    # Opens (and loads) stores over one data directory; whatever is still
+    # open at the end is closed without saving.
+    stores = []
+
+    def open_store(**options):
+        store = InventoryStore(
+            str(tmp_path / "inventory"), str(tmp_path / "logs"), **options
+        )
+        store.load()
+        stores.append(store)
+        return store
+
+    yield open_store
+    for store in stores:
+        store.close(save=False)
+
+
+def crash(store):
+    # Leaves the files as a killed process would: whatever was flushed,
+    # without the compaction close() does.
+    store.close(save=False)
+    if store.storage.__class__.__name__ == "JsonStorage":
+        journal_file = store.storage._journal_file
+        if journal_file is not None:
+            journal_file.close()
+            store.storage._journal_file = None
@@ -0,0 +1,91 @@
+import gzip
+import os
+from datetime import datetime
+
+import pytest
+
+import audit_log
+from audit_log import AuditLog
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Sets the time AuditLog.write stamps entries with.
+    class Clock(datetime):
+        current = datetime(2024, 1, 1, 23, 59)
+
+        @classmethod
+        def now(cls, tz=None):
+            return cls.current
+
+    monkeypatch.setattr(audit_log, "datetime", Clock)
+    return Clock
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_entries_are_written_in_order(tmp_path, clock):
+    log = AuditLog(str(tmp_path))
+    for number in range(100):
+        log.write(f"entry {number}")
+    log.flush()
+    lines = read(log.path("20240101")).splitlines()
+    assert lines[0] == "[2024-01-01 23:59:00] entry 0"
+    assert len(lines) == 100 and lines[-1].endswith("entry 99")
+    log.close()
+
+
+def test_rolls_over_past_max_bytes(tmp_path, clock):
+    log = AuditLog(str(tmp_path), max_bytes=100)
+    for number in range(6):
+        log.write(f"entry {number} " + "x" * 5)
+    log.close()
+    # 36 bytes an entry, so two fit in each file.
+    parts = [read(log.path("20240101", part)) for part in range(3)]
+    assert [part.count("\n") for part in parts] == [2, 2, 2]
+    assert "entry 5" in parts[2]
+    assert not os.path.exists(log.path("20240101", 3))
+
+    # A restarted log carries on in the newest part.
+    log = AuditLog(str(tmp_path), max_bytes=100)
+    log.write("entry 6")
+    log.close()
+    assert read(log.path("20240101", 3)).endswith("entry 6\n")
+
+
+def test_rolls_over_at_midnight(tmp_path, clock):
+    log = AuditLog(str(tmp_path))
+    log.write("before")
+    log.flush()
+    clock.current = datetime(2024, 1, 2, 0, 0, 1)
+    log.write("after")
+    log.close()
+    assert read(log.path("20240101")).endswith("before\n")
+    assert read(log.path("20240102")) == "[2024-01-02 00:00:01] after\n"
+
+
+def test_compresses_finished_days(tmp_path, clock):
+    log = AuditLog(str(tmp_path), max_bytes=40, compress=True)
+    log.write("one " + "x" * 20)
+    log.write("two " + "x" * 20)
+    log.flush()
+    clock.current = datetime(2024, 1, 2, 8, 0)
+    log.write("three")
+    log.close()
+
+    for part, text in [(0, "one"), (1, "two")]:
+        path = log.path("20240101", part)
+        assert not os.path.exists(path)
+        with gzip.open(path + ".gz", "rt", encoding="utf-8") as f:
+            assert f.read().endswith(f"{text} {'x' * 20}\n")
+    assert os.path.exists(log.path("20240102"))
+
+    # Days left uncompressed by an earlier run are picked up at start.
+    clock.current = datetime(2024, 1, 3, 8, 0)
+    AuditLog(str(tmp_path), compress=True).close()
+    assert not os.path.exists(log.path("20240102"))
+    with gzip.open(log.path("20240102") + ".gz", "rt", encoding="utf-8") as f:
+        assert f.read().endswith("three\n")
@@ -0,0 +1,76 @@
+from datetime import date
+
+import pytest
+
+from sales_mmap import SalesFile, write_sales_file
+from storage import open_storage
+from summary_engine import SummaryEngine
+
+START = date(2024, 1, 1)
+END = date(2024, 1, 31)
+
+
+def baskets(store):
+    store.add_product("Apple", 100, 100)
+    store.add_product("Pear", 50, 100)
+    basket_id, lines = store.record_basket(
+        [("Apple", 1), ("Pear", 2), ("Apple", 3)], date(2024, 1, 5)
+    )
+    store.record_sale("Pear", 1, date(2024, 1, 5))
+    return basket_id, lines
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_basket_is_one_transaction(open_store, backend):
+    store = open_store(backend=backend)
+    basket_id, lines = baskets(store)
+    assert [line["id"] for line in lines] == [f"{basket_id}-1", f"{basket_id}-2"]
+    assert lines[0]["quantity"] == 4
+    report = store.summary(START, END)
+    assert report["transactions"] == 2
+    assert report["products"]["Apple"]["count"] == 1
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_basket_rejected_as_a_whole(open_store, backend):
+    store = open_store(backend=backend)
+    store.add_product("Apple", 100, 1)
+    store.add_product("Pear", 50, 10)
+    with pytest.raises(ValueError):
+        store.record_basket([("Pear", 2), ("Apple", 2)], date(2024, 1, 5))
+    assert len(store.transactions) == 0
+    assert store.products[store.products.find_id("Pear")]["stock"] == 10
+
+
+def seed(directory, backend):
+    # Sales from before baskets whose ids happen to contain "-": the
+    # suffix is not all digits, so they are not basket lines.
+    storage = open_storage(backend, directory)
+    _, transactions = storage.load()
+    sales = {}
+    for transaction_id in ["AB-1x", "AB-2x"]:
+        sales[transaction_id] = transactions.add(
+            {"id": transaction_id, "date": date(2024, 1, 7), "product_id": "P",
+             "product": "Plum", "quantity": 1, "total": 1}
+        )
+    storage.commit(sales=sales)
+    storage.close()
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_backends_count_a_split_basket_per_day(open_store, tmp_path, backend):
+    directory = tmp_path / "inventory"
+    directory.mkdir()
+    seed(str(directory), backend)
+    store = open_store(backend=backend)
+    basket_id, lines = baskets(store)
+    store.edit_sale(lines[1]["id"], "Pear", 2, date(2024, 1, 6))
+
+    assert store.summary(START, END)["transactions"] == 5
+    assert store.storage.transaction_count(START, END) == 5
+    path = str(tmp_path / "sales.dat")
+    write_sales_file(path, store.transactions)
+    with SalesFile(path) as sales_file:
+        assert sales_file.transaction_count(START, END) == 5
+    with SummaryEngine(path, workers=2, min_rows=0) as engine:
+        assert engine.transaction_count(START, END) == 5
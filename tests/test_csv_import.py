@@ -0,0 +1,73 @@
+from datetime import date
+
+import pytest
+
+import csv_import
+from conftest import crash
+from csv_import import import_csv
+
+
+def test_import_into_a_local_store(open_store, tmp_path):
+    store = open_store()
+    events = []
+    store.listeners.append(lambda event, item: events.append(event))
+
+    products = tmp_path / "products.csv"
+    # Written by a spreadsheet: a byte order mark and an extra column.
+    products.write_text(
+        "\ufeffname,price,stock,notes\n"
+        "Apple,100,10,\n"
+        "Pear,abc,5,\n"
+        "Kiwi,1e30,5,\n"
+        "apple,90,1,\n"
+        "Plum,50.4,2,ripe\n",
+        encoding="utf-8",
+    )
+    imported, errors = import_csv(store, str(products), "products")
+    assert imported == 2
+    assert [line for line, _ in errors] == [3, 4, 5]
+    assert [(data["name"], data["price"]) for data in store.products.values()] == [
+        ("Apple", 100),
+        ("Plum", 50),
+    ]
+
+    sales = tmp_path / "sales.csv"
+    sales.write_text(
+        "date,product,quantity\n"
+        "2024-01-01,Apple,3\n"
+        "01/02/2024,Apple,1\n"
+        "2024-01-02,Plum,5\n"
+        "2024-01-03,plum,2\n"
+    )
+    pending = store.storage.pending
+    imported, errors = import_csv(store, str(sales), "sales")
+    assert imported == 2
+    assert [line for line, _ in errors] == [3, 4]
+    # One journal record and one notification for the whole file.
+    assert store.storage.pending == pending + 1
+    assert events == ["bulk_changed", "bulk_changed"]
+
+    crash(store)
+    store = open_store()
+    report = store.summary(date(2024, 1, 1), date(2024, 1, 31))
+    assert report["transactions"] == 2
+    assert store.products[store.products.find_id("Plum")]["stock"] == 0
+
+
+def test_missing_column_imports_nothing(open_store, tmp_path):
+    store = open_store()
+    path = tmp_path / "sales.csv"
+    path.write_text("date,product\n2024-01-01,Apple\n")
+    with pytest.raises(ValueError, match="quantity"):
+        import_csv(store, str(path), "sales")
+    assert len(store.transactions) == 0
+
+
+def test_command_line_reports_skipped_rows(tmp_path, capsys):
+    path = tmp_path / "products.csv"
+    path.write_text("name,price,stock\nApple,100,10\nPear,50,-1\n")
+    options = ["--directory", str(tmp_path / "inventory"), "--logs", str(tmp_path)]
+    assert csv_import.main(["products", str(path)] + options) == 1
+    captured = capsys.readouterr()
+    assert f"{path}:3: Stock cannot be negative" in captured.err
+    assert "Imported 1 products, skipped 1" in captured.out
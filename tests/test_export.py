@@ -0,0 +1,77 @@
+import os
+from datetime import date
+
+import pytest
+
+import storage
+
+
+@pytest.fixture
+def json_store(open_store):
+    store = open_store()
+    store.add_product("Apple", 100, 10)
+    store.record_sale("Apple", 2, date(2024, 1, 1))
+    store.close()
+    return store.storage.directory
+
+
+def test_export_needs_an_output(json_store):
+    with pytest.raises(SystemExit):
+        storage.main(["export", "--directory", json_store])
+
+
+def test_export_refuses_a_data_directory(json_store, tmp_path):
+    before = sorted(os.listdir(json_store))
+    for output in [json_store, os.path.dirname(json_store) + "/./inventory"]:
+        options = ["--directory", json_store, "--output", output]
+        assert storage.main(["export", "--source", "json"] + options) == 1
+    assert sorted(os.listdir(json_store)) == before
+
+
+def test_export_from_missing_database_creates_nothing(json_store, tmp_path):
+    output = str(tmp_path / "export")
+    assert storage.main(["export", "--directory", json_store, "--output", output]) == 1
+    assert not os.path.exists(os.path.join(json_store, "inventory.db"))
+    assert not os.path.exists(output)
+
+
+def test_export_json(json_store, tmp_path):
+    before = sorted(os.listdir(json_store))
+    output = str(tmp_path / "export")
+    assert storage.main(
+        ["export", "--source", "json", "--directory", json_store, "--output", output]
+    ) == 0
+    assert sorted(os.listdir(json_store)) == before
+
+    products, transactions = storage.JsonStorage(output).load()
+    assert [data["name"] for data in products.values()] == ["Apple"]
+    assert [sale["quantity"] for sale in transactions.records()] == [2]
+
+
+def test_export_from_empty_database_writes_nothing(tmp_path):
+    directory = str(tmp_path / "inventory")
+    os.makedirs(directory)
+    storage.SqliteStorage(directory).close()
+    output = str(tmp_path / "export")
+    assert storage.main(["export", "--directory", directory, "--output", output]) == 1
+    assert not os.path.exists(output)
+
+
+def test_migrate_refuses_a_database_in_use(json_store):
+    assert storage.main(["migrate", "--directory", json_store]) == 0
+    # The database moves on from the JSON files it was migrated from.
+    sqlite = storage.SqliteStorage(json_store)
+    sqlite.commit(sales={sale["id"]: None for sale in sqlite.load()[1]})
+    sqlite.close()
+
+    assert storage.main(["migrate", "--directory", json_store]) == 1
+    sqlite = storage.SqliteStorage(json_store)
+    products, transactions = sqlite.load()
+    sqlite.close()
+    assert len(products) == 1 and len(transactions) == 0
+
+    assert storage.main(["migrate", "--directory", json_store, "--force"]) == 0
+    sqlite = storage.SqliteStorage(json_store)
+    products, transactions = sqlite.load()
+    sqlite.close()
+    assert len(products) == 1 and len(transactions) == 1
@@ -0,0 +1,80 @@
+import os
+from datetime import date
+
+from conftest import crash
+
+
+def journal_path(store):
+    return store.storage.journal_path
+
+
+def tear(path, data=b'{"sales": {"X'):
+    # The start of a record cut off mid-append.
+    with open(path, "ab") as f:
+        f.write(data)
+
+
+def test_journal_replays_after_crash(open_store):
+    store = open_store()
+    store.add_product("Apple", 100, 10)
+    sale = store.record_sale("Apple", 2, date(2024, 1, 1))
+    crash(store)
+
+    store = open_store()
+    assert store.transactions.get(sale["id"])["quantity"] == 2
+    assert store.products[sale["product_id"]]["stock"] == 8
+
+
+def test_torn_journal_line_does_not_hide_later_records(open_store):
+    store = open_store()
+    store.add_product("Apple", 100, 10)
+    first = store.record_sale("Apple", 1, date(2024, 1, 1))
+    crash(store)
+    tear(journal_path(store))
+
+    store = open_store()
+    second = store.record_sale("Apple", 2, date(2024, 1, 2))
+    crash(store)
+    tear(journal_path(store))
+
+    store = open_store()
+    third = store.record_sale("Apple", 3, date(2024, 1, 3))
+    crash(store)
+
+    store = open_store()
+    for sale in [first, second, third]:
+        assert store.transactions.get(sale["id"]) is not None
+    assert store.products[first["product_id"]]["stock"] == 4
+
+
+def test_record_without_newline_is_kept(open_store):
+    store = open_store()
+    store.add_product("Apple", 100, 10)
+    first = store.record_sale("Apple", 1, date(2024, 1, 1))
+    crash(store)
+    path = journal_path(store)
+    with open(path, "rb+") as f:
+        f.truncate(os.path.getsize(path) - 1)
+
+    store = open_store()
+    second = store.record_sale("Apple", 2, date(2024, 1, 2))
+    crash(store)
+
+    store = open_store()
+    assert store.transactions.get(first["id"]) is not None
+    assert store.transactions.get(second["id"]) is not None
+
+
+def test_journal_without_header_is_started_again(open_store):
+    store = open_store()
+    store.add_product("Apple", 100, 10)
+    store.close()
+    with open(journal_path(store), "wb") as f:
+        f.write(b'{"gener')
+
+    store = open_store()
+    sale = store.record_sale("Apple", 1, date(2024, 1, 1))
+    crash(store)
+
+    store = open_store()
+    assert store.transactions.get(sale["id"]) is not None
@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+import pytest
+
+from money import INT64_MAX, parse_money
+
+
+@pytest.mark.parametrize(
+    "value, amount",
+    [
+        (1500, 1500),
+        ("1500", 1500),
+        (" 1500 ", 1500),
+        ("1500.00", 1500),
+        # Written while amounts were Decimals.
+        (Decimal("1500.5"), 1501),
+        ("1499.5", 1500),
+        ("1.5e3", 1500),
+        (str(INT64_MAX), INT64_MAX),
+    ],
+)
+def test_parse_money(value, amount):
+    assert parse_money(value) == amount
+    assert type(parse_money(value)) is int
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "",
+        "abc",
+        "12abc",
+        "NaN",
+        "Infinity",
+        "1e19",
+        "-1e30",
+        "1e999999999",
+        str(INT64_MAX + 1),
+        2**64,
+    ],
+)
+def test_parse_money_rejects(value):
+    with pytest.raises(ValueError):
+        parse_money(value)
@@ -0,0 +1,91 @@
+import json
+import os
+from datetime import date
+
+import pytest
+
+import storage as storage_module
+from storage import JsonStorage
+
+
+def sale(sale_id, day, quantity=1):
+    return {"id": sale_id, "date": day, "product_id": "A", "product": "Apple",
+            "quantity": quantity, "total": 100 * quantity}
+
+
+def state(storage):
+    return dict(storage.products), sorted(
+        storage.transactions.records(), key=lambda sale: sale["id"]
+    )
+
+
+def partition_files(directory):
+    return sorted(os.listdir(os.path.join(directory, "sales")))
+
+
+@pytest.fixture
+def saved(tmp_path):
+    # Sales in January and February saved as partitions, without a journal.
+    directory = str(tmp_path)
+    storage = JsonStorage(directory, journal=False)
+    storage.load()
+    storage.products["A"] = {"name": "Apple", "price": 100, "stock": 5}
+    for transaction in [sale("S1", date(2024, 1, 5)), sale("S2", date(2024, 2, 5))]:
+        storage.transactions.add(transaction)
+    storage.commit(products={"A": storage.products["A"]})
+    return directory, storage
+
+
+def test_partitions_round_trip(saved):
+    directory, storage = saved
+    with open(os.path.join(directory, "sales", "manifest.json")) as f:
+        manifest = json.load(f)
+    assert sorted(manifest["partitions"]) == ["2024-01", "2024-02"]
+
+    loaded = JsonStorage(directory, journal=False)
+    loaded.load()
+    assert state(loaded) == state(storage)
+
+
+def test_only_changed_months_are_rewritten(saved):
+    directory, storage = saved
+    before = partition_files(directory)
+    storage.transactions.add(sale("S3", date(2024, 2, 6)))
+    storage.commit(sales={"S3": storage.transactions.get("S3")})
+    after = partition_files(directory)
+
+    january = [name for name in before if name.startswith("2024-01")]
+    assert january and set(january) <= set(after)
+    assert not {name for name in before if name.startswith("2024-02")} & set(after)
+
+
+def test_interrupted_save_keeps_the_previous_partitions(saved, monkeypatch):
+    directory, storage = saved
+    expected = state(storage)
+
+    write_json = storage_module.write_json
+
+    def crash_at_manifest(path, data):
+        if path.endswith("manifest.json"):
+            raise OSError("disk full")
+        write_json(path, data)
+
+    monkeypatch.setattr(storage_module, "write_json", crash_at_manifest)
+    storage.transactions.add(sale("S3", date(2024, 2, 6)))
+    storage.transactions.remove("S1")
+    with pytest.raises(OSError):
+        storage.commit(sales={"S1": None})
+    monkeypatch.undo()
+
+    # The old manifest still points at whole, unchanged files.
+    loaded = JsonStorage(directory, journal=False)
+    loaded.load()
+    assert state(loaded) == expected
+
+    # The next save clears the files the interrupted one left behind.
+    loaded.transactions.add(sale("S4", date(2024, 3, 1)))
+    loaded.commit(sales={"S4": loaded.transactions.get("S4")})
+    with open(os.path.join(directory, "sales", "manifest.json")) as f:
+        manifest = json.load(f)
+    in_use = {partition["file"] for partition in manifest["partitions"].values()}
+    assert set(partition_files(directory)) == in_use | {"manifest.json"}
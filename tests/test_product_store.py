@@ -0,0 +1,44 @@
+from datetime import date
+
+import pytest
+
+from product_store import ProductStore
+
+
+def test_name_index_follows_renames_and_deletes():
+    products = ProductStore([("A", {"name": "Apple", "price": 100, "stock": 5})])
+    products["B"] = {"name": "Pear", "price": 50, "stock": 0}
+    assert products.find_id("  aPPLE ") == "A"
+
+    products.rename("A", "Green Apple")
+    assert products.find_id("apple") is None
+    assert products.find_id("green apple") == "A"
+
+    # Replacing a product's data re-indexes it under the new name.
+    products["B"] = {"name": "Nashi", "price": 50, "stock": 0}
+    assert products.find_id("pear") is None
+    assert products.find_id("NASHI") == "B"
+
+    del products["A"]
+    assert products.find_id("green apple") is None
+    assert products.pop("B")["name"] == "Nashi"
+    assert products.find_id("nashi") is None
+    assert products.pop("B", None) is None
+
+
+def test_names_are_unique_ignoring_case(open_store):
+    store = open_store()
+    product_id = store.add_product("Apple", 100, 5)
+    with pytest.raises(ValueError):
+        store.add_product("APPLE", 100, 5)
+
+    store.edit_product(product_id, "Green Apple", 100, 5)
+    # The old name is free again, and the new one is taken.
+    store.add_product("apple", 90, 5)
+    with pytest.raises(ValueError):
+        store.add_product("green APPLE", 100, 5)
+
+    store.delete_product(product_id)
+    store.add_product("Green Apple", 100, 5)
+    sale = store.record_sale("GREEN apple", 1, date(2024, 1, 1))
+    assert sale["product"] == "Green Apple"
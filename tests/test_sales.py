@@ -0,0 +1,88 @@
+from datetime import date
+
+import pytest
+
+
+@pytest.fixture
+def orphan(open_store):
+    # A store with a sale whose product has been deleted.
+    store = open_store()
+    product_id = store.add_product("Apple", 100, 10)
+    store.add_product("Pear", 50, 10)
+    sale = store.record_sale("Apple", 2, date(2024, 1, 1))
+    store.delete_product(product_id)
+    return store, sale
+
+
+def test_delete_sale_of_deleted_product(orphan):
+    store, sale = orphan
+    store.delete_sale(sale["id"])
+    assert store.transactions.get(sale["id"]) is None
+    assert sale["product_id"] not in store.products
+
+
+def test_edit_sale_of_deleted_product_onto_another(orphan):
+    store, sale = orphan
+    edited = store.edit_sale(sale["id"], "Pear", 3, date(2024, 1, 2))
+    pear_id = store.products.find_id("Pear")
+    assert edited["product_id"] == pear_id
+    assert store.products[pear_id]["stock"] == 7
+
+
+def test_edit_sale_of_deleted_product_keeping_it(orphan):
+    store, sale = orphan
+    with pytest.raises(ValueError):
+        store.edit_sale(sale["id"], "Apple", 1, date(2024, 1, 2))
+
+
+def test_server_reports_edit_of_deleted_product(orphan):
+    from server import InventoryServer
+
+    store, sale = orphan
+    server = InventoryServer(("127.0.0.1", 0), store)
+    try:
+        status, text = server.dispatch(
+            "PUT",
+            "/sales/" + sale["id"],
+            {},
+            {"product": "Apple", "quantity": 1, "date": "2024-01-02"},
+        )
+        assert status == 400
+        assert "Missing field" not in text
+        status, _ = server.dispatch("DELETE", "/sales/" + sale["id"], {}, None)
+        assert status == 200
+    finally:
+        server.server_close()
+
+
+@pytest.mark.parametrize(
+    "price, stock, quantity",
+    [(2**63, 10, 1), (100, 2**63, 1), (2**62, 10, 2)],
+)
+def test_out_of_range_values_leave_the_store_working(
+    open_store, price, stock, quantity
+):
+    store = open_store()
+    store.add_product("Pear", 50, 10)
+    # Rejected when the product is added, or else when it is sold.
+    with pytest.raises(ValueError):
+        store.add_product("Apple", price, stock)
+        store.record_sale("Apple", quantity, date(2024, 1, 1))
+    assert len(store.transactions) == 0
+
+    sale = store.record_sale("Pear", 1, date(2024, 1, 1))
+    assert store.transactions.get(sale["id"])["total"] == 50
+
+
+def test_sales_store_checks_a_sale_before_adding_it():
+    from sales_store import SalesStore
+
+    sales = SalesStore()
+    sale = {"id": "S1", "date": date(2024, 1, 1), "product_id": "A",
+            "product": "Apple", "quantity": 1, "total": 2**63}
+    with pytest.raises(ValueError):
+        sales.add(sale)
+    sales.add(dict(sale, total=100))
+    with pytest.raises(ValueError):
+        sales.update("S1", {"quantity": -(2**63) - 1})
+    assert list(sales.records()) == [dict(sale, total=100)]
@@ -0,0 +1,61 @@
+import os
+from datetime import date
+
+import pytest
+
+import sales_mmap
+from conftest import crash
+from sales_mmap import SalesFile, write_sales_file
+from sales_store import SalesStore
+
+
+def test_sales_file_round_trip(tmp_path):
+    sales = SalesStore(
+        [
+            {"id": "S1", "date": date(2024, 1, 2), "product_id": "A",
+             "product": "Apple", "quantity": 1, "total": 100},
+            {"id": "K1-1", "date": date(2024, 1, 1), "product_id": "B",
+             "product": "Pear", "quantity": 2, "total": 100},
+        ]
+    )
+    path = str(tmp_path / "sales.dat")
+    write_sales_file(path, sales)
+    with SalesFile(path) as sales_file:
+        assert [sales_file[index] for index in range(len(sales_file))] == list(
+            sales.records()
+        )
+        rows = sales_file.rows_between(date(2024, 1, 2), date(2024, 1, 31))
+        assert [sales_file[index]["id"] for index in rows] == ["S1"]
+
+
+def test_truncated_sales_file_is_rejected(tmp_path):
+    path = str(tmp_path / "sales.dat")
+    write_sales_file(path, SalesStore())
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(data[:-1])
+    with pytest.raises(ValueError):
+        SalesFile(path)
+
+
+def test_writing_the_sales_file_leaves_a_running_store_alone(open_store):
+    store = open_store()
+    store.add_product("Apple", 100, 10)
+    store.record_sale("Apple", 1, date(2024, 1, 1))
+    directory = store.storage.directory
+    assert sales_mmap.main(["--directory", directory]) == 0
+
+    # The register keeps appending to the journal it has open.
+    second = store.record_sale("Apple", 2, date(2024, 1, 2))
+    crash(store)
+    store = open_store()
+    assert len(store.transactions) == 2
+    assert store.transactions.get(second["id"]) is not None
+
+
+def test_sales_file_from_missing_database_creates_nothing(tmp_path):
+    directory = str(tmp_path / "inventory")
+    os.makedirs(directory)
+    assert sales_mmap.main(["--directory", directory, "--source", "sqlite"]) == 1
+    assert os.listdir(directory) == []
@@ -0,0 +1,48 @@
+import random
+from datetime import date
+
+from sales_store import SalesStore
+
+
+def test_order_follows_adds_moves_and_removals():
+    random.seed(7)
+    sales = SalesStore()
+    # (date ordinal, recording order) for each sale still in the store.
+    expected = {}
+    for number in range(2000):
+        step = random.random()
+        sale_date = date(2024, 1, random.randint(1, 20))
+        if step < 0.6 or not expected:
+            sale_id = f"S{number}"
+            sales.add(
+                {"id": sale_id, "date": sale_date, "product_id": "A",
+                 "product": "Apple", "quantity": 1, "total": 100}
+            )
+            expected[sale_id] = (sale_date.toordinal(), number)
+        elif step < 0.8:
+            sale_id = random.choice(list(expected))
+            sales.update(sale_id, {"date": sale_date})
+            expected[sale_id] = (sale_date.toordinal(), expected[sale_id][1])
+        else:
+            sale_id = random.choice(list(expected))
+            sales.remove(sale_id)
+            del expected[sale_id]
+
+    oldest_first = sorted(expected, key=expected.get)
+    assert [sale["id"] for sale in sales] == oldest_first
+    newest_first = sorted(
+        expected, key=lambda sale_id: (-expected[sale_id][0], expected[sale_id][1])
+    )
+    view = sales.newest_first()
+    assert [view[index]["id"] for index in range(len(view))] == newest_first
+    for index in random.sample(range(len(view)), 50):
+        assert view.index(sales.get(newest_first[index])) == index
+
+    start, end = date(2024, 1, 5), date(2024, 1, 9)
+    assert [sale["id"] for sale in sales.records(start, end)] == [
+        sale_id
+        for sale_id in oldest_first
+        if start.toordinal() <= expected[sale_id][0] <= end.toordinal()
+    ]
+    copy = SalesStore.from_columns(*sales.columns())
+    assert list(copy.records()) == list(sales.records())
@@ -0,0 +1,73 @@
+import queue
+import threading
+import time
+
+from search import SearchIndex, SearchWorker
+
+
+class FakeRoot:
+    # Runs root.after callbacks when pump() is called, on the calling thread.
+    def __init__(self):
+        self.calls = queue.Queue()
+
+    def after(self, delay, callback):
+        self.calls.put(callback)
+        return callback
+
+    def after_cancel(self, timer):
+        pass
+
+    def pump(self, seconds=2.0):
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            try:
+                callback = self.calls.get(timeout=0.01)
+            except queue.Empty:
+                continue
+            callback()
+
+
+def test_worker_survives_a_failing_search():
+    root = FakeRoot()
+    errors = []
+    results = []
+    worker = SearchWorker(root, on_error=errors.append)
+
+    def fail(cancelled):
+        raise KeyError("gone")
+
+    worker.submit("products", fail, results.append)
+    root.pump(0.2)
+    assert [type(error) for error in errors] == [KeyError]
+    assert not worker.running("products")
+
+    worker.submit("products", lambda cancelled: "found", results.append)
+    root.pump(0.2)
+    assert results == ["found"]
+
+
+def test_index_changes_during_searches():
+    index = SearchIndex()
+    stop = threading.Event()
+    failures = []
+
+    def search():
+        while not stop.is_set():
+            try:
+                index.find_products("pro")
+            except Exception as e:
+                failures.append(e)
+                return
+
+    thread = threading.Thread(target=search)
+    thread.start()
+    try:
+        for round in range(300):
+            for number in range(20):
+                index.add_product(f"P{number}", f"product {round} {number}")
+            for number in range(20):
+                index.remove_product(f"P{number}")
+    finally:
+        stop.set()
+        thread.join()
+    assert failures == []
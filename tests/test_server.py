@@ -0,0 +1,53 @@
+import threading
+from datetime import date
+
+import pytest
+
+from client import InventoryClient
+from csv_import import import_csv
+from server import InventoryServer
+
+
+@pytest.fixture
+def client(open_store):
+    store = open_store()
+    server = InventoryServer(("127.0.0.1", 0), store)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = InventoryClient(f"http://127.0.0.1:{server.server_port}")
+    client.load()
+    yield client
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_import_csv_through_the_server(client, tmp_path):
+    events = []
+    client.listeners.append(lambda event, item: events.append(event))
+
+    products = tmp_path / "products.csv"
+    products.write_text("name,price,stock\nApple,100,10\nPear,abc,5\nKiwi,50\n")
+    imported, errors = import_csv(client, str(products), "products")
+    assert imported == 1
+    assert [line for line, _ in errors] == [3, 4]
+    assert [data["name"] for data in client.products.values()] == ["Apple"]
+
+    sales = tmp_path / "sales.csv"
+    sales.write_text("date,product,quantity\n2024-01-01,Apple,3\n2024-01-02,Apple,30\n")
+    imported, errors = import_csv(client, str(sales), "sales")
+    assert imported == 1 and len(errors) == 1
+    assert next(iter(client.products.values()))["stock"] == 7
+    assert events == ["bulk_changed", "bulk_changed"]
+
+    report = client.summary(date(2024, 1, 1), date(2024, 1, 31))
+    assert report["transactions"] == 1
+
+
+def test_import_with_missing_column_sends_nothing(client, tmp_path):
+    path = tmp_path / "products.csv"
+    path.write_text("name,price\nApple,100\n")
+    version = client.version
+    with pytest.raises(ValueError):
+        import_csv(client, str(path), "products")
+    assert client.request("GET", "/version")["version"] == version
@@ -0,0 +1,167 @@
+import os
+from datetime import date
+
+import pytest
+
+from product_store import ProductStore
+from sales_store import SalesStore
+from snapshot import SnapshotError, read_generation, read_snapshot, write_snapshot
+from storage import JsonStorage
+
+
+def sample():
+    products = ProductStore(
+        [
+            ("A", {"name": "Apple", "price": 100, "stock": 5}),
+            ("B", {"name": "Pear", "price": 50, "stock": 0}),
+        ]
+    )
+    sales = SalesStore(
+        [
+            {"id": "S1", "date": date(2024, 1, 2), "product_id": "A",
+             "product": "Apple", "quantity": 1, "total": 100},
+            {"id": "K1-1", "date": date(2024, 1, 1), "product_id": "B",
+             "product": "Pear", "quantity": 2, "total": 100},
+            {"id": "K1-2", "date": date(2024, 1, 1), "product_id": "A",
+             "product": "Green Apple", "quantity": 3, "total": 300},
+        ]
+    )
+    return products, sales
+
+
+def state(products, transactions):
+    return dict(products), sorted(transactions.records(), key=lambda sale: sale["id"])
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    products, sales = sample()
+    write_snapshot(path, products, sales, 4)
+
+    assert read_generation(path) == 4
+    generation, loaded_products, loaded_sales = read_snapshot(path)
+    assert generation == 4
+    assert state(loaded_products, loaded_sales) == state(products, sales)
+    start, end = date(2024, 1, 1), date(2024, 1, 31)
+    assert loaded_sales.summary(start, end) == sales.summary(start, end)
+    assert loaded_sales.transaction_count(start, end) == 2
+
+
+@pytest.mark.parametrize(
+    "damage",
+    [
+        lambda data: data[:-5],
+        lambda data: data[:-3] + bytes([data[-3] ^ 0xFF]) + data[-2:],
+        lambda data: b"NOTSNAP\0" + data[8:],
+    ],
+)
+def test_damaged_snapshot_is_rejected(tmp_path, damage):
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot(path, *sample(), 1)
+    with open(path, "rb") as f:
+        data = f.read()
+    with open(path, "wb") as f:
+        f.write(damage(data))
+    with pytest.raises(SnapshotError):
+        read_snapshot(path)
+
+
+def checkpointed(directory):
+    # Two checkpoints and a journal on top of the newest, as left by a
+    # crash: returns the state a load must come back to.
+    storage = JsonStorage(directory)
+    storage.load()
+    storage.products["A"] = {"name": "Apple", "price": 100, "stock": 5}
+    sale = storage.transactions.add(
+        {"id": "S1", "date": date(2024, 1, 1), "product_id": "A",
+         "product": "Apple", "quantity": 1, "total": 100}
+    )
+    storage.commit(products={"A": storage.products["A"]}, sales={"S1": sale})
+    storage.compact()
+    sale = storage.transactions.add(
+        {"id": "S2", "date": date(2024, 1, 2), "product_id": "A",
+         "product": "Apple", "quantity": 2, "total": 200}
+    )
+    storage.commit(sales={"S2": sale})
+    storage.compact()
+    storage.transactions.remove("S1")
+    storage.commit(sales={"S1": None})
+    storage._journal_file.close()
+    return state(storage.products, storage.transactions)
+
+
+def test_damaged_newest_snapshot_falls_back_to_previous(tmp_path, capsys):
+    directory = str(tmp_path)
+    expected = checkpointed(directory)
+    path = os.path.join(directory, "snapshot.bin")
+    with open(path, "r+b") as f:
+        f.seek(-3, os.SEEK_END)
+        byte = f.read(1)
+        f.seek(-3, os.SEEK_END)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+    storage = JsonStorage(directory)
+    storage.load()
+    assert state(storage.products, storage.transactions) == expected
+    assert "Skipping damaged snapshot" in capsys.readouterr().err
+
+    # The fallback wrote a sound checkpoint in its place.
+    storage = JsonStorage(directory)
+    storage.load()
+    assert state(storage.products, storage.transactions) == expected
+    assert read_snapshot(path)[0] == storage.generation
+
+
+def test_journal_that_does_not_fit_is_set_aside(tmp_path, capsys):
+    directory = str(tmp_path)
+    checkpointed(directory)
+    storage = JsonStorage(directory)
+    storage.load()
+    expected = state(storage.products, storage.transactions)
+    storage.close()
+
+    journal = os.path.join(directory, "journal.log")
+    with open(journal, "w") as f:
+        f.write('{"generation": 99}\n{"sales": {"S1": null, "S2": null}}\n')
+
+    storage = JsonStorage(directory)
+    storage.load()
+    assert state(storage.products, storage.transactions) == expected
+    assert os.path.exists(journal + ".skipped")
+    assert not os.path.exists(journal)
+    assert "does not apply" in capsys.readouterr().err
+
+
+def test_crash_between_checkpoint_renames(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    checkpointed(directory)
+    storage = JsonStorage(directory)
+    storage.load()
+    rename = os.replace
+
+    def crash_on_new_snapshot(source, target):
+        if source.endswith(".new"):
+            raise OSError("crashed")
+        rename(source, target)
+
+    monkeypatch.setattr(os, "replace", crash_on_new_snapshot)
+    with pytest.raises(OSError):
+        storage.compact()
+    monkeypatch.undo()
+    assert not os.path.exists(storage.snapshot_path)
+    expected = state(storage.products, storage.transactions)
+
+    storage = JsonStorage(directory)
+    storage.load()
+    assert state(storage.products, storage.transactions) == expected
+    sale = storage.transactions.add(
+        {"id": "S3", "date": date(2024, 1, 3), "product_id": "A",
+         "product": "Apple", "quantity": 3, "total": 300}
+    )
+    storage.commit(sales={"S3": sale})
+    storage._journal_file.close()
+
+    storage = JsonStorage(directory)
+    storage.load()
+    assert storage.transactions.get("S3") is not None
+    assert not os.path.exists(storage.journal_path + ".skipped")
@@ -0,0 +1,79 @@
+from datetime import date
+
+import pytest
+
+from sales_mmap import SalesFile, write_sales_file
+from summary_cache import summarize
+
+START = date(2024, 1, 1)
+END = date(2024, 12, 31)
+
+
+def renamed_history(store):
+    product_id = store.add_product("iPhone XR", 100, 100)
+    old = store.record_sale("iPhone XR", 1, date(2024, 1, 10))
+    store.record_sale("iPhone XR", 1, date(2024, 2, 10))
+    store.edit_product(product_id, "iPhone XR Refurb", 80, 100)
+    new = store.record_sale("iPhone XR Refurb", 1, date(2024, 3, 10))
+    return old, new
+
+
+EXPECTED = {
+    "iPhone XR": {"quantity": 2, "total": 200, "count": 2},
+    "iPhone XR Refurb": {"quantity": 1, "total": 80, "count": 1},
+}
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_renamed_product_is_reported_under_each_name(open_store, backend):
+    store = open_store(backend=backend)
+    renamed_history(store)
+    assert store.summary(START, END)["products"] == EXPECTED
+    assert summarize(store.storage, START, END)["products"] == EXPECTED
+
+    store.close()
+    store = open_store(backend=backend)
+    assert store.summary(START, END)["products"] == EXPECTED
+
+
+def test_report_does_not_depend_on_edit_history(open_store):
+    store = open_store()
+    old, new = renamed_history(store)
+    store.edit_sale(old["id"], "iPhone XR Refurb", 3, old["date"])
+    # The edited sale keeps its product and becomes a sale of the new name.
+    before = store.summary(START, END)
+    store.close()
+
+    store = open_store()
+    assert store.summary(START, END) == before
+    assert before["products"]["iPhone XR"]["count"] == 1
+
+
+def test_removing_the_latest_sale_removes_its_name(open_store):
+    store = open_store()
+    old, new = renamed_history(store)
+    store.delete_sale(new["id"])
+    assert store.summary(START, END)["products"] == {
+        "iPhone XR": {"quantity": 2, "total": 200, "count": 2}
+    }
+
+
+def test_sales_file_and_cache_agree_with_the_store(open_store, tmp_path):
+    store = open_store()
+    renamed_history(store)
+    store.record_basket(
+        [("iPhone XR Refurb", 1), ("iPhone XR Refurb", 2)], date(2024, 3, 11)
+    )
+    path = str(tmp_path / "sales.dat")
+    write_sales_file(path, store.transactions)
+
+    ranges = [
+        (START, END),
+        (date(2024, 1, 15), date(2024, 3, 10)),
+        (date(2024, 2, 1), date(2024, 2, 29)),
+    ]
+    with SalesFile(path) as sales_file:
+        for start, end in ranges:
+            expected = summarize(store.storage, start, end)
+            assert store.summary(start, end) == expected
+            assert store.summary(start, end, sales_file) == expected
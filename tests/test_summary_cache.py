@@ -0,0 +1,62 @@
+from datetime import date
+
+from summary_cache import SummaryCache
+
+
+def test_hits_and_misses_by_range_and_month(open_store):
+    store = open_store()
+    store.add_product("Apple", 100, 100)
+    for month in [1, 2, 3, 4]:
+        store.record_sale("Apple", month, date(2024, month, 10))
+    cache = store.summary_cache
+
+    first = store.summary(date(2024, 1, 1), date(2024, 3, 31))
+    assert store.summary(date(2024, 1, 1), date(2024, 3, 31)) == first
+    assert first["products"]["Apple"]["quantity"] == 6
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert (cache.month_hits, cache.month_misses) == (0, 3)
+
+    # Only April is new; the partial month at the end is not cached.
+    report = store.summary(date(2024, 2, 1), date(2024, 5, 15))
+    assert report["products"]["Apple"]["quantity"] == 9
+    assert (cache.month_hits, cache.month_misses) == (2, 4)
+
+
+def test_reports_handed_out_are_copies(open_store):
+    store = open_store()
+    store.add_product("Apple", 100, 100)
+    store.record_sale("Apple", 1, date(2024, 1, 10))
+    start, end = date(2024, 1, 1), date(2024, 1, 31)
+    store.summary(start, end)["products"]["Apple"]["quantity"] = 99
+    assert store.summary(start, end)["products"]["Apple"]["quantity"] == 1
+
+
+def test_a_change_drops_everything_cached(open_store):
+    store = open_store()
+    store.add_product("Apple", 100, 100)
+    store.record_sale("Apple", 1, date(2024, 1, 10))
+    start, end = date(2024, 1, 1), date(2024, 1, 31)
+    assert store.summary(start, end)["transactions"] == 1
+
+    store.record_sale("Apple", 2, date(2024, 1, 11))
+    report = store.summary(start, end)
+    assert report["transactions"] == 2
+    assert report["products"]["Apple"]["quantity"] == 3
+    assert store.summary_cache.stats()["entries"] == 2
+    assert store.summary_cache.misses == 2
+
+
+def test_least_recently_used_entries_go_first():
+    cache = SummaryCache(max_bytes=100)
+    cache.put("a", 1, 40)
+    cache.put("b", 2, 40)
+    assert cache.get("a") == 1
+    cache.put("c", 3, 40)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.bytes == 80
+
+    # Larger than the whole cache: not kept, and nothing else is evicted.
+    cache.put("d", 4, 101)
+    assert cache.get("d") is None
+    assert cache.stats()["entries"] == 2
@@ -0,0 +1,133 @@
+class VirtualTable:
+    # Only the rows inside a window of `window` positions exist as Treeview
+    # items, keyed by record id. Rendering diffs the window against what is
+    # already in the widget, so a change to one record touches one item and
+    # scrolling by n rows inserts and deletes n items.
+    def __init__(self, tree, scrollbar, format_row, window=100):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.format_row = format_row
+        self.window = window
+
+        self.rows = []
+        self.offset = 0
+        self.selected = set()
+        self._shown = []
+        self._values = {}
+
+        scrollbar.configure(command=self.yview)
+        tree.configure(yscrollcommand=self.on_tree_scroll)
+        tree.bind("<MouseWheel>", self.on_mousewheel)
+        tree.bind("<Button-4>", lambda event: self.scroll(-3))
+        tree.bind("<Button-5>", lambda event: self.scroll(3))
+        tree.bind("<Configure>", lambda event: self.update_scrollbar())
+        tree.bind("<<TreeviewSelect>>", self.on_select, add="+")
+
+    def set_rows(self, rows):
+        self.rows = rows
+        self.render()
+
+    # The row source is changed by the caller; these keep the rows on screen
+    # where they are when something is added or removed above them.
+    def row_added(self, index):
+        if index < self.offset:
+            self.offset += 1
+
+    def row_removed(self, index, key):
+        if index < self.offset:
+            self.offset -= 1
+        self.selected.discard(key)
+
+    def key(self, item):
+        return item if item in self._values else None
+
+    def visible_rows(self):
+        bbox = self.tree.bbox(self._shown[0]) if self._shown else ""
+        if not bbox:
+            return max(1, self.tree.winfo_height() // 20 - 1)
+        _, top, _, row_height = bbox
+        return max(1, (self.tree.winfo_height() - top) // row_height)
+
+    def render(self):
+        count = len(self.rows)
+        self.offset = max(0, min(self.offset, count - self.visible_rows()))
+        end = min(count, self.offset + self.window)
+
+        wanted = []
+        for index in range(self.offset, end):
+            try:
+                wanted.append(self.format_row(self.rows[index]))
+            except IndexError:
+                # A remote row source can shrink between len() and reading
+                # the rows; show what is there until the next refresh.
+                break
+        wanted_keys = {key for key, _ in wanted}
+
+        for key in self._shown:
+            if key not in wanted_keys:
+                self.tree.delete(key)
+                del self._values[key]
+        current = [key for key in self._shown if key in wanted_keys]
+
+        for position, (key, values) in enumerate(wanted):
+            if key not in self._values:
+                self.tree.insert("", position, iid=key, values=values)
+                current.insert(position, key)
+            else:
+                if position >= len(current) or current[position] != key:
+                    self.tree.move(key, "", position)
+                    current.remove(key)
+                    current.insert(position, key)
+                if self._values[key] != values:
+                    self.tree.item(key, values=values)
+            self._values[key] = values
+        self._shown = current
+
+        selection = tuple(key for key in current if key in self.selected)
+        if selection != self.tree.selection():
+            self.tree.selection_set(selection)
+        self.tree.yview_moveto(0)
+        self.update_scrollbar()
+
+    def update_scrollbar(self):
+        count = len(self.rows)
+        if not count:
+            self.scrollbar.set(0, 1)
+            return
+        self.scrollbar.set(
+            self.offset / count,
+            min(1, (self.offset + self.visible_rows()) / count),
+        )
+
+    def scroll(self, delta):
+        self.offset += delta
+        self.render()
+        return "break"
+
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * len(self.rows))
+            self.render()
+        elif args[0] == "scroll":
+            step = int(args[1])
+            if args[2] == "pages":
+                step *= self.visible_rows()
+            self.scroll(step)
+
+    def on_mousewheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def on_tree_scroll(self, first, last):
+        # Keyboard navigation past the last visible row scrolls the Treeview
+        # itself; fold that into our offset so the items stay pinned at top.
+        shift = round(float(first) * len(self._shown))
+        if shift:
+            self.offset += shift
+            self.render()
+        else:
+            self.update_scrollbar()
+
+    def on_select(self, event=None):
+        self.selected = (self.selected - set(self._shown)) | {
+            item for item in self.tree.selection() if item in self._values
+        }